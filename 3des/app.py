@@ -1,38 +1,318 @@
-from flask import Flask, render_template, request, jsonify
-from Crypto.Cipher import DES3
+from flask import Flask, render_template, request, jsonify, Response
+from Crypto.Cipher import AES, ChaCha20_Poly1305, DES3
 from Crypto.Util.Padding import pad, unpad
 from base64 import b64encode, b64decode
+from werkzeug.utils import secure_filename
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import hashlib
+import hmac
+import json
 import os
+import threading
 
 app = Flask(__name__, template_folder='.')
 
-# --- Triple DES (3DES) Functions ---
-def encrypt_3des(plaintext, key1_str, key2_str, key3_str):
+# --- Key Derivation ---
+# Keys come from PBKDF2-HMAC-SHA256 over all three key strings and a salt that is stored in
+# every envelope (see the cipher registry below). Ciphertexts without an algorithm prefix are the
+# legacy base64(iv + ciphertext) produced with the pad-and-truncate keys, and still decrypt.
+KDF_ITERATIONS = 200_000
+SALT_SIZE = 16
+KEY_CACHE_SIZE = 256
+
+_key_cache = OrderedDict()   # sha256(keys, salt, size) -> derived key, least recently used first
+_salt_for_keys = {}          # sha256(keys) -> salt this process encrypts with for that key set
+_key_lock = threading.Lock()
+
+def _key_material(key1_str, key2_str, key3_str):
+    # JSON keeps ("ab", "c") and ("a", "bc") apart
+    return json.dumps([key1_str, key2_str, key3_str]).encode('utf-8')
+
+def derive_key(key1_str, key2_str, key3_str, salt, size=24):
+    """Return a size-byte key (24 for 3DES) for these keys and salt.
+       Derived keys are kept in a bounded LRU keyed by a hash of the inputs (never the raw keys),
+       so a returning user pays the PBKDF2 cost once.
+    """
+    material = _key_material(key1_str, key2_str, key3_str)
+    cache_key = hashlib.sha256(material + salt + bytes([size])).digest()
+    with _key_lock:
+        key = _key_cache.get(cache_key)
+        if key is not None:
+            _key_cache.move_to_end(cache_key)
+            return key
+    # DES ignores the parity bits, so the raw PBKDF2 output is a valid 3DES key
+    key = hashlib.pbkdf2_hmac('sha256', material, salt, KDF_ITERATIONS, dklen=size)
+    with _key_lock:
+        _key_cache[cache_key] = key
+        if len(_key_cache) > KEY_CACHE_SIZE:
+            _key_cache.popitem(last=False)
+    return key
+
+def encryption_salt(key1_str, key2_str, key3_str):
+    """Return the salt to encrypt with under this key set.
+       Each key set gets a random salt the first time it encrypts, and later messages reuse it
+       (with a fresh IV/nonce each), so encryption hits the key cache too.
+    """
+    keys_id = hashlib.sha256(_key_material(key1_str, key2_str, key3_str)).digest()
+    with _key_lock:
+        salt = _salt_for_keys.get(keys_id)
+        if salt is None:
+            if len(_salt_for_keys) >= KEY_CACHE_SIZE:
+                _salt_for_keys.pop(next(iter(_salt_for_keys)))
+            salt = _salt_for_keys[keys_id] = os.urandom(SALT_SIZE)
+    return salt
+
+def legacy_key(key1_str, key2_str, key3_str):
     # Keys must be exactly 8 bytes for DES
     key1 = pad(key1_str.encode('utf-8'), 8)[:8]
     key2 = pad(key2_str.encode('utf-8'), 8)[:8]
     key3 = pad(key3_str.encode('utf-8'), 8)[:8]
     
     # Concatenate the three 8-byte keys to form a single 24-byte key for 3DES
-    key = key1 + key2 + key3
-    
-    cipher = DES3.new(key, DES3.MODE_CBC)
-    ciphertext = cipher.encrypt(pad(plaintext.encode('utf-8'), DES3.block_size))
-    return b64encode(cipher.iv + ciphertext).decode('utf-8')
+    return key1 + key2 + key3
+
+# --- Cipher Registry ---
+# Envelopes are "<algorithm id>$" + base64(salt + cipher output). Every cipher takes the same
+# three keys; seal/open work on bytes and the salt is handled by encrypt_text/decrypt_text.
+class TripleDESCipher:
+    """3DES-CBC with PKCS#7 padding; output is iv + ciphertext (not authenticated)."""
+    name = "3des-pbkdf2"
+
+    def key_for(self, key1_str, key2_str, key3_str, salt):
+        return derive_key(key1_str, key2_str, key3_str, salt)
+
+    def seal(self, key, data):
+        cipher = DES3.new(key, DES3.MODE_CBC)
+        return cipher.iv + cipher.encrypt(pad(data, DES3.block_size))
+
+    def open(self, key, blob):
+        cipher = DES3.new(key, DES3.MODE_CBC, blob[:DES3.block_size])
+        return unpad(cipher.decrypt(blob[DES3.block_size:]), DES3.block_size)
+
+class AEADCipher:
+    """An AEAD cipher with a 256-bit key; output is nonce + ciphertext + 16-byte tag.
+       The algorithm id is bound in as associated data, and is mixed into the KDF salt so
+       each algorithm gets its own key from the same three key strings.
+    """
+
+    def __init__(self, name, new_cipher, nonce_size=12):
+        self.name = name
+        self.new_cipher = new_cipher   # (key, nonce) -> pycryptodome cipher object
+        self.nonce_size = nonce_size
+
+    def key_for(self, key1_str, key2_str, key3_str, salt):
+        return derive_key(key1_str, key2_str, key3_str, salt + self.name.encode('utf-8'), 32)
+
+    def seal(self, key, data):
+        nonce = os.urandom(self.nonce_size)
+        cipher = self.new_cipher(key, nonce)
+        cipher.update(self.name.encode('utf-8'))
+        ciphertext, tag = cipher.encrypt_and_digest(data)
+        return nonce + ciphertext + tag
+
+    def open(self, key, blob):
+        nonce, ciphertext, tag = blob[:self.nonce_size], blob[self.nonce_size:-16], blob[-16:]
+        cipher = self.new_cipher(key, nonce)
+        cipher.update(self.name.encode('utf-8'))
+        return cipher.decrypt_and_verify(ciphertext, tag)
+
+CIPHERS = {c.name: c for c in (
+    TripleDESCipher(),
+    AEADCipher("aes-256-gcm", lambda key, nonce: AES.new(key, AES.MODE_GCM, nonce=nonce)),
+    AEADCipher("chacha20-poly1305", lambda key, nonce: ChaCha20_Poly1305.new(key=key, nonce=nonce)),
+)}
+DEFAULT_ALGORITHM = "3des-pbkdf2"
+
+def _cipher(algorithm):
+    spec = CIPHERS.get(algorithm)
+    if spec is None:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    return spec
+
+def _seal_text(spec, salt, key, plaintext):
+    sealed = spec.seal(key, plaintext.encode('utf-8'))
+    return spec.name + "$" + b64encode(salt + sealed).decode('utf-8')
+
+def _parse_envelope(ciphertext):
+    """Split a ciphertext into (cipher, salt, sealed bytes) without deriving anything.
+       salt is None for a prefix-less legacy ciphertext, which is base64(iv + ciphertext) under
+       the pad-and-truncate key, exactly what TripleDESCipher.open expects.
+    """
+    algorithm, sep, body = ciphertext.partition("$")
+    if not sep:
+        return CIPHERS["3des-pbkdf2"], None, b64decode(ciphertext)
+    spec = _cipher(algorithm)
+    data = b64decode(body)
+    return spec, data[:SALT_SIZE], data[SALT_SIZE:]
+
+def _envelope_key(spec, salt, key1_str, key2_str, key3_str):
+    if salt is None:
+        return legacy_key(key1_str, key2_str, key3_str)
+    return spec.key_for(key1_str, key2_str, key3_str, salt)
+
+def _unwrap(ciphertext, key1_str, key2_str, key3_str):
+    """Split a ciphertext into (cipher, key, sealed bytes), deriving (or fetching) the key."""
+    spec, salt, sealed = _parse_envelope(ciphertext)
+    return spec, _envelope_key(spec, salt, key1_str, key2_str, key3_str), sealed
+
+def encrypt_text(plaintext, key1_str, key2_str, key3_str, algorithm=DEFAULT_ALGORITHM):
+    spec = _cipher(algorithm)
+    salt = encryption_salt(key1_str, key2_str, key3_str)
+    return _seal_text(spec, salt, spec.key_for(key1_str, key2_str, key3_str, salt), plaintext)
+
+def decrypt_text(ciphertext, key1_str, key2_str, key3_str):
+    """Decrypt any envelope from encrypt_text, or a legacy prefix-less 3DES ciphertext."""
+    spec, key, sealed = _unwrap(ciphertext, key1_str, key2_str, key3_str)
+    return spec.open(key, sealed).decode('utf-8')
+
+# --- Triple DES (3DES) Functions ---
+def encrypt_3des(plaintext, key1_str, key2_str, key3_str):
+    return encrypt_text(plaintext, key1_str, key2_str, key3_str, "3des-pbkdf2")
 
 def decrypt_3des(ciphertext, key1_str, key2_str, key3_str):
-    key1 = pad(key1_str.encode('utf-8'), 8)[:8]
-    key2 = pad(key2_str.encode('utf-8'), 8)[:8]
-    key3 = pad(key3_str.encode('utf-8'), 8)[:8]
-    
-    key = key1 + key2 + key3
-    
-    data = b64decode(ciphertext)
-    iv = data[:DES3.block_size]
-    encrypted_text = data[DES3.block_size:]
+    return decrypt_text(ciphertext, key1_str, key2_str, key3_str)
+
+# --- Batch Mode ---
+# One key set, many {text, action} items: the encryption key is derived once per batch (only if
+# something is encrypted) and every envelope's key is looked up before any cipher work starts, so
+# worker threads only run the cipher calls (pycryptodome releases the GIL inside them). Each new
+# salt costs a full PBKDF2 run, so decrypt items may use at most MAX_BATCH_SALTS distinct salts.
+MAX_BATCH_ITEMS = 1000
+MAX_BATCH_SALTS = 8
+BATCH_PARALLEL_MIN = 32   # smaller batches are not worth handing to the pool
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+def _get_batch_pool():
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+        return _batch_pool
+
+def _run_item(job):
+    if isinstance(job, dict):
+        return job   # already an error
+    try:
+        return {'result': job()}
+    except Exception as e:
+        return {'error': f"Error: {str(e)}. Please check your keys or input."}
+
+def process_batch(items, key1_str, key2_str, key3_str, algorithm=DEFAULT_ALGORITHM, parallel=False):
+    """Encrypt/decrypt every {text, action} item; returns one {'result'} or {'error'} per item, in order."""
+    spec = _cipher(algorithm)
+    sealing = None    # (salt, key) for encrypt items, derived on the first one
+    salts = set()     # (algorithm, salt) pairs the decrypt items need keys for
+
+    jobs = []
+    for item in items:
+        text = item.get('text') if isinstance(item, dict) else None
+        action = item.get('action') if isinstance(item, dict) else None
+        if not isinstance(text, str):
+            jobs.append({'error': "Each item needs a 'text' string."})
+        elif action == 'encrypt':
+            if sealing is None:
+                salt = encryption_salt(key1_str, key2_str, key3_str)
+                sealing = salt, spec.key_for(key1_str, key2_str, key3_str, salt)
+            jobs.append(partial(_seal_text, spec, sealing[0], sealing[1], text))
+        elif action == 'decrypt':
+            try:
+                item_spec, item_salt, sealed = _parse_envelope(text)
+                if item_salt is not None:
+                    salt_id = (item_spec.name, item_salt)
+                    if salt_id not in salts and len(salts) >= MAX_BATCH_SALTS:
+                        raise ValueError(f"At most {MAX_BATCH_SALTS} distinct salts per batch")
+                    salts.add(salt_id)
+                item_key = _envelope_key(item_spec, item_salt, key1_str, key2_str, key3_str)
+            except Exception as e:
+                jobs.append({'error': f"Error: {str(e)}. Please check your keys or input."})
+                continue
+            jobs.append(lambda s=item_spec, k=item_key, b=sealed: s.open(k, b).decode('utf-8'))
+        else:
+            jobs.append({'error': "Action must be 'encrypt' or 'decrypt'."})
+
+    if parallel and len(jobs) >= BATCH_PARALLEL_MIN:
+        return list(_get_batch_pool().map(_run_item, jobs))
+    return [_run_item(job) for job in jobs]
+
+# --- Streaming File Mode ---
+# Encrypted files are FILE_MAGIC + salt + key check + iv + 3DES-CBC ciphertext, processed
+# STREAM_CHUNK_SIZE bytes at a time through one cipher object, so memory stays constant whatever
+# the file size. The key check (a truncated HMAC of the derived key) lets decryption reject a wrong
+# key before any plaintext is streamed.
+FILE_MAGIC = b"3DESF1"
+KEY_CHECK_SIZE = 8
+STREAM_CHUNK_SIZE = 64 * 1024   # a multiple of the 8-byte block size
+FILE_HEADER_SIZE = len(FILE_MAGIC) + SALT_SIZE + KEY_CHECK_SIZE + DES3.block_size
+
+def _key_check(key):
+    return hmac.new(key, b"3DESF1 key check", hashlib.sha256).digest()[:KEY_CHECK_SIZE]
+
+def _read_exact(stream, size):
+    data = b""
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+def encrypt_3des_stream(stream, key1_str, key2_str, key3_str, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the encrypted file for a readable binary stream: header first, then ciphertext per chunk."""
+    salt = encryption_salt(key1_str, key2_str, key3_str)
+    key = derive_key(key1_str, key2_str, key3_str, salt)
+    cipher = DES3.new(key, DES3.MODE_CBC)
+    yield FILE_MAGIC + salt + _key_check(key) + cipher.iv
+    pending = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        if pending:
+            chunk = pending + chunk
+        full = len(chunk) - len(chunk) % DES3.block_size
+        pending = chunk[full:]
+        if full:
+            yield cipher.encrypt(chunk[:full])
+    yield cipher.encrypt(pad(pending, DES3.block_size))
+
+def decrypt_3des_stream(stream, key1_str, key2_str, key3_str, chunk_size=STREAM_CHUNK_SIZE):
+    """Read and check the header and key, then return a generator of plaintext chunks.
+       Both are checked before anything is yielded, so a bad file or a wrong key is reported up front.
+    """
+    header = _read_exact(stream, FILE_HEADER_SIZE)
+    if len(header) < FILE_HEADER_SIZE or not header.startswith(FILE_MAGIC):
+        raise ValueError("Not a 3DES encrypted file")
+    salt_end = len(FILE_MAGIC) + SALT_SIZE
+    salt = header[len(FILE_MAGIC):salt_end]
+    check = header[salt_end:salt_end + KEY_CHECK_SIZE]
+    iv = header[salt_end + KEY_CHECK_SIZE:]
+    key = derive_key(key1_str, key2_str, key3_str, salt)
+    if not hmac.compare_digest(_key_check(key), check):
+        raise ValueError("Wrong keys for this file")
     cipher = DES3.new(key, DES3.MODE_CBC, iv)
-    decrypted_text = unpad(cipher.decrypt(encrypted_text), DES3.block_size)
-    return decrypted_text.decode('utf-8')
+
+    def chunks():
+        pending = b""
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            if pending:
+                chunk = pending + chunk
+            # hold back the last full block: it carries the padding
+            full = len(chunk) - len(chunk) % DES3.block_size
+            if full == len(chunk):
+                full -= DES3.block_size
+            pending = chunk[full:]
+            if full > 0:
+                yield cipher.decrypt(chunk[:full])
+        if len(pending) != DES3.block_size:
+            raise ValueError("Encrypted file is truncated")
+        yield unpad(cipher.decrypt(pending), DES3.block_size)
+    return chunks()
 
 # --- Flask Routes ---
 @app.route('/')
@@ -51,6 +331,7 @@ def process():
     key2 = data['key2']
     key3 = data['key3']
     action = data['action']
+    algorithm = data.get('algorithm') or DEFAULT_ALGORITHM
 
     try:
         # Check if keys are provided
@@ -58,13 +339,67 @@ def process():
             return jsonify({'error': "Please provide all three keys."}), 400
 
         if action == 'encrypt':
-            result = encrypt_3des(text, key1, key2, key3)
+            result = encrypt_text(text, key1, key2, key3, algorithm)
         elif action == 'decrypt':
-            result = decrypt_3des(text, key1, key2, key3)
+            # the algorithm is read from the ciphertext itself
+            result = decrypt_text(text, key1, key2, key3)
+        else:
+            return jsonify({'error': "Action must be 'encrypt' or 'decrypt'."}), 400
     except Exception as e:
         return jsonify({'error': f"Error: {str(e)}. Please check your keys or input."}), 400
 
     return jsonify({'result': result})
 
+@app.route('/process-batch', methods=['POST'])
+def process_batch_route():
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    key1 = data.get('key1')
+    key2 = data.get('key2')
+    key3 = data.get('key3')
+    algorithm = data.get('algorithm') or DEFAULT_ALGORITHM
+
+    if not key1 or not key2 or not key3:
+        return jsonify({'error': "Please provide all three keys."}), 400
+    if not isinstance(items, list):
+        return jsonify({'error': "'items' must be a list of {text, action} objects."}), 400
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({'error': f"At most {MAX_BATCH_ITEMS} items per batch."}), 400
+
+    try:
+        results = process_batch(items, key1, key2, key3, algorithm, bool(data.get('parallel')))
+    except Exception as e:
+        return jsonify({'error': f"Error: {str(e)}. Please check your keys or input."}), 400
+
+    return jsonify({'results': results})
+
+@app.route('/process-file/<action>', methods=['POST'])
+def process_file(action):
+    # The file is the raw request body (not a multipart form), so it is read straight off the
+    # connection as it is encrypted instead of being spooled first. Keys travel in headers.
+    key1 = request.headers.get('X-Key1')
+    key2 = request.headers.get('X-Key2')
+    key3 = request.headers.get('X-Key3')
+    name = secure_filename(request.headers.get('X-Filename', '')) or 'file'
+
+    if not key1 or not key2 or not key3:
+        return jsonify({'error': "Please provide all three keys."}), 400
+
+    try:
+        if action == 'encrypt':
+            body = encrypt_3des_stream(request.stream, key1, key2, key3)
+            filename = name + '.3des'
+        elif action == 'decrypt':
+            body = decrypt_3des_stream(request.stream, key1, key2, key3)
+            filename = name[:-len('.3des')] if name.endswith('.3des') else name + '.dec'
+        else:
+            return jsonify({'error': "Action must be 'encrypt' or 'decrypt'."}), 400
+    except Exception as e:
+        return jsonify({'error': f"Error: {str(e)}. Please check your keys or input."}), 400
+
+    # no Content-Length, so the body goes out chunked as it is produced
+    return Response(body, mimetype='application/octet-stream',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -1,29 +1,45 @@
 # app.py
-from flask import Flask, render_template, request, redirect, url_for, flash
-import os, json, uuid
-from ciphers import encrypt_note, decrypt_note
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+import os, uuid
+from ciphers import encrypt_note, decrypt_note, pack_metadata
+from storage import open_store, PAGE_SIZE
 
 app = Flask(__name__)
 app.secret_key = "dev-secret"  # for demo only. Change in real deployments.
 
 DATA_DIR = "data"
-NOTES_FILE = os.path.join(DATA_DIR, "notes.json")
 os.makedirs(DATA_DIR, exist_ok=True)
+# "sqlite" (default; data/notes.json is migrated on first start) or "json" (legacy file)
+NOTES_BACKEND = os.environ.get("NOTES_BACKEND", "sqlite")
+store = open_store(NOTES_BACKEND, DATA_DIR)
 
-def load_notes():
-    if not os.path.exists(NOTES_FILE):
-        return []
-    with open(NOTES_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+MAX_PAGE_SIZE = 500
 
-def save_notes(notes):
-    with open(NOTES_FILE, "w", encoding="utf-8") as f:
-        json.dump(notes, f, indent=2)
+def _page_args():
+    """Read ?cursor=&limit= from the query string (bad or negative values fall back to the defaults)."""
+    try:
+        cursor = int(request.args.get("cursor", 0))
+    except ValueError:
+        cursor = None
+    if cursor is not None and cursor <= 0:
+        cursor = None
+    try:
+        limit = min(max(int(request.args.get("limit", PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        limit = PAGE_SIZE
+    return cursor, limit
 
 @app.route("/")
 def index():
-    notes = load_notes()
-    return render_template("index.html", notes=notes)
+    cursor, limit = _page_args()
+    notes, next_cursor = store.list_page(cursor, limit)
+    return render_template("index.html", notes=notes, next_cursor=next_cursor, limit=limit)
+
+@app.route("/api/notes")
+def api_list_notes():
+    cursor, limit = _page_args()
+    notes, next_cursor = store.list_page(cursor, limit)
+    return jsonify({"notes": notes, "next_cursor": next_cursor})
 
 @app.route("/new", methods=["GET", "POST"])
 def new_note():
@@ -44,19 +60,16 @@ def new_note():
             "id": str(uuid.uuid4()),
             "title": title,
             "ciphertext": cipher,
-            "metadata": metadata
+            "metadata": pack_metadata(metadata)
         }
-        notes = load_notes()
-        notes.append(note)
-        save_notes(notes)
+        store.add_note(note)
         flash("Note encrypted and saved (ciphertext stored).", "success")
         return redirect(url_for("index"))
     return render_template("new.html")
 
 @app.route("/view/<note_id>", methods=["GET","POST"])
 def view_note(note_id):
-    notes = load_notes()
-    note = next((n for n in notes if n["id"] == note_id), None)
+    note = store.get_note(note_id)
     if not note:
         flash("Note not found.", "danger")
         return redirect(url_for("index"))
@@ -78,5 +91,119 @@ def view_note(note_id):
                 flash("Decryption failed (wrong keys or corrupted data).", "danger")
     return render_template("view.html", note=note, decrypted=decrypted_text)
 
+# ---------------------------
+# JSON API
+# ---------------------------
+MAX_BULK_ITEMS = 1000
+
+def _api_error(code, message, status=400, **extra):
+    error = {"code": code, "message": message}
+    error.update(extra)
+    return jsonify({"error": error}), status
+
+def _parse_keys(item):
+    """Pull (caesar_shift, vkey, pkey) out of a JSON object; returns (keys, error_dict)."""
+    try:
+        caesar_shift = int(item.get("caesar_shift", 3)) % 26
+    except (TypeError, ValueError, OverflowError):   # OverflowError: JSON Infinity / -Infinity
+        return None, {"code": "invalid_caesar_shift", "message": "caesar_shift must be an integer."}
+    vkey = str(item.get("vkey") or "").strip()
+    pkey = str(item.get("pkey") or "").strip()
+    if not vkey or not pkey:
+        return None, {"code": "missing_keys", "message": "Vigenere key (vkey) and Playfair keyword (pkey) are required."}
+    # the ciphers work on A-Z only; an accented letter would silently drop out of the Playfair grid
+    if any(c.isalpha() and not c.isascii() for c in vkey + pkey):
+        return None, {"code": "invalid_keys", "message": "Keys may only contain the letters A-Z."}
+    return (caesar_shift, vkey, pkey), None
+
+def _decrypt_stored(note, keys):
+    """Decrypt a stored note; returns (plaintext, error_dict)."""
+    try:
+        return decrypt_note(note["ciphertext"], *keys, note["metadata"]), None
+    except Exception:
+        return None, {"code": "decryption_failed", "message": "Decryption failed (wrong keys or corrupted data)."}
+
+def _json_items(field):
+    """The non-empty list under `field` in the request body, or an error response."""
+    body = request.get_json(silent=True)
+    items = body.get(field) if isinstance(body, dict) else None
+    if not isinstance(items, list) or not items:
+        return None, _api_error("invalid_body", f"Expected a JSON object with a non-empty '{field}' list.")
+    if len(items) > MAX_BULK_ITEMS:
+        return None, _api_error("too_many_items", f"At most {MAX_BULK_ITEMS} items per request.", 413)
+    return items, None
+
+@app.route("/api/notes", methods=["POST"])
+def api_create_notes():
+    """Encrypt and store many notes; all are validated first and written in a single store call."""
+    items, error = _json_items("notes")
+    if error:
+        return error
+    notes = []
+    errors = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({"index": i, "code": "invalid_item", "message": "Each note must be a JSON object."})
+            continue
+        keys, key_error = _parse_keys(item)
+        if key_error:
+            errors.append(dict(key_error, index=i))
+            continue
+        try:
+            cipher, metadata = encrypt_note(str(item.get("plaintext", "")), *keys)
+        except ValueError as e:
+            errors.append({"index": i, "code": "encryption_failed", "message": str(e)})
+            continue
+        notes.append({
+            "id": str(uuid.uuid4()),
+            "title": str(item.get("title") or "Untitled"),
+            "ciphertext": cipher,
+            "metadata": pack_metadata(metadata)
+        })
+    if errors:
+        return _api_error("invalid_notes", "No notes were saved; fix the listed items.", 400, items=errors)
+    store.add_notes(notes)
+    return jsonify({"notes": [{"id": n["id"], "title": n["title"]} for n in notes]}), 201
+
+@app.route("/api/notes/<note_id>/decrypt", methods=["POST"])
+def api_decrypt_note(note_id):
+    keys, key_error = _parse_keys(request.get_json(silent=True) or {})
+    if key_error:
+        return _api_error(key_error["code"], key_error["message"])
+    note = store.get_note(note_id)
+    if not note:
+        return _api_error("not_found", "Note not found.", 404)
+    plaintext, error = _decrypt_stored(note, keys)
+    if error:
+        return _api_error(error["code"], error["message"], 422)
+    return jsonify({"id": note_id, "plaintext": plaintext})
+
+@app.route("/api/notes/decrypt", methods=["POST"])
+def api_decrypt_notes():
+    """Decrypt many notes; every item gets its own result or error."""
+    items, error = _json_items("items")
+    if error:
+        return error
+    ids = [item.get("id") for item in items if isinstance(item, dict)]
+    notes = store.get_notes([i for i in ids if isinstance(i, str)])
+    results = []
+    for item in items:
+        if not isinstance(item, dict):
+            results.append({"error": {"code": "invalid_item", "message": "Each item must be a JSON object."}})
+            continue
+        note_id = item.get("id")
+        keys, item_error = _parse_keys(item)
+        note = notes.get(note_id) if isinstance(note_id, str) else None
+        if not item_error and note is None:
+            item_error = {"code": "not_found", "message": "Note not found."}
+        plaintext = None
+        if not item_error:
+            plaintext, item_error = _decrypt_stored(note, keys)
+        if item_error:
+            results.append({"id": note_id, "error": item_error})
+        else:
+            results.append({"id": note_id, "plaintext": plaintext})
+    return jsonify({"results": results})
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -3,7 +3,17 @@
 # Designed to keep non-alpha characters in original positions (they are recorded and reinserted).
 # Also records where 'J' originally occurred (Playfair merges I/J).
 
+import base64
+import os
 import string
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
+
+try:
+    import numpy as np
+except ImportError:  # optional: only used to speed up large notes
+    np = None
 
 ALPHA = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
 
@@ -33,41 +43,83 @@ def _record_non_alpha_and_letters(text):
 def _reinsert_non_alpha(original_length, letters_only, non_alpha_positions, j_positions):
     """Reconstruct full text of length original_length by inserting non-alpha chars at positions.
        j_positions: indices within letters_only which should be restored to 'J'.
+       Single merge walk: the letter runs between consecutive non-alpha positions are sliced
+       straight out of letters_only.
     """
-    # Convert letters_only into list and restore J's
-    letters_list = list(letters_only)
-    for pos in j_positions:
-        if 0 <= pos < len(letters_list):
-            letters_list[pos] = 'J'
+    if j_positions:
+        letters_list = list(letters_only)
+        for pos in j_positions:
+            if 0 <= pos < len(letters_list):
+                letters_list[pos] = 'J'
+        letters_only = ''.join(letters_list)
 
-    out = [None] * original_length
-    # place non-alpha
-    for idx, ch in non_alpha_positions:
-        out[idx] = ch
-
-    # place letters in remaining slots left-to-right
+    pieces = []
     li = 0
-    for i in range(original_length):
-        if out[i] is None:
-            if li < len(letters_list):
-                out[i] = letters_list[li]
-                li += 1
-            else:
-                out[i] = ''  # safety
-    return ''.join(out)
+    prev = 0
+    # encrypt_note records positions in ascending order, so this sort is a linear pass
+    for idx, ch in sorted(non_alpha_positions, key=itemgetter(0)):
+        if idx < prev:
+            # duplicate position: the later char wins
+            pieces[-1] = ch
+            continue
+        gap = idx - prev
+        pieces.append(letters_only[li:li + gap])
+        li += gap
+        pieces.append(ch)
+        prev = idx + 1
+    # remaining slots; running out of letters leaves them empty, as before
+    pieces.append(letters_only[li:li + original_length - prev])
+    return ''.join(pieces)
+
+def drop_positions(text, positions):
+    """Return text with the characters at the given indices removed (out-of-range ones ignored).
+       Linear: keeps the slices between consecutive positions instead of popping from a list.
+    """
+    pieces = []
+    prev = 0
+    for idx in sorted(positions):
+        if prev <= idx < len(text):
+            pieces.append(text[prev:idx])
+            prev = idx + 1
+    pieces.append(text[prev:])
+    return ''.join(pieces)
+
+# ---------------------------
+# Translate tables
+# ---------------------------
+# Every Caesar shift / Vigenere key letter is a fixed permutation of A-Z, so we
+# build the translate tables once and let str.translate / bytes.translate do the
+# per-character work in C instead of calling ALPHA.index() for every letter.
+_NOT_ALPHA = str.maketrans('', '', ALPHA)
+
+@lru_cache(maxsize=None)
+def _reduced_shift_table(shift):
+    return str.maketrans(ALPHA, ALPHA[shift:] + ALPHA[:shift])
+
+@lru_cache(maxsize=None)
+def _reduced_shift_bytes_table(shift):
+    return bytes.maketrans(ALPHA.encode(), (ALPHA[shift:] + ALPHA[:shift]).encode())
+
+# Callers pass arbitrary ints (e.g. caesar_shift + key letter), so the shift is reduced before
+# the cache lookup: the caches never hold more than 26 tables each.
+def _shift_table(shift):
+    """str.translate table mapping A-Z -> A-Z shifted by `shift` (other chars untouched)."""
+    return _reduced_shift_table(shift % 26)
+
+def _shift_bytes_table(shift):
+    """bytes.translate table, same mapping as _shift_table but for ASCII buffers."""
+    return _reduced_shift_bytes_table(shift % 26)
+
+def _check_letters(letters):
+    # ALPHA.index() used to raise for anything outside A-Z; keep that contract.
+    if letters.translate(_NOT_ALPHA):
+        raise ValueError("Vigenere input must contain only letters A-Z")
 
 # ---------------------------
 # Caesar
 # ---------------------------
 def caesar_encrypt_letters(letters, shift):
-    shift = shift % 26
-    out = []
-    for ch in letters:
-        if ch in ALPHA:
-            out.append(ALPHA[(ALPHA.index(ch) + shift) % 26])
-        else:
-            out.append(ch)
-    return ''.join(out)
+    return letters.translate(_shift_table(shift))
 
 def caesar_decrypt_letters(letters, shift):
     return caesar_encrypt_letters(letters, -shift)
@@ -75,51 +127,68 @@ def caesar_decrypt_letters(letters, shift):
 # ---------------------------
 # Vigenere
 # ---------------------------
-def _extend_key(key, length):
+def _normalize_key(key):
     key = ''.join([c for c in key.upper() if c.isalpha()])
     if not key:
         raise ValueError("Vigenere key must contain letters")
+    return key
+
+def _extend_key(key, length):
+    key = _normalize_key(key)
     times = (length + len(key) - 1) // len(key)
     return (key * times)[:length]
 
+def _vigenere_apply(letters, key, sign):
+    """Shift letters[i] by sign * key[i % len(key)].
+       Every len(key)-th letter uses the same key letter, so each residue class is
+       one extended-slice translate on an ASCII buffer.
+    """
+    _check_letters(letters)
+    key = _normalize_key(key)
+    buf = bytearray(letters, 'ascii')
+    period = len(key)
+    for i, k in enumerate(key[:len(buf)]):
+        # ALPHA.index(k) semantics: non A-Z key letters (e.g. accented) still raise
+        buf[i::period] = buf[i::period].translate(_shift_bytes_table(sign * ALPHA.index(k)))
+    return buf.decode('ascii')
+
 def vigenere_encrypt_letters(letters, key):
     if not letters:
         return ''
-    key_stream = _extend_key(key, len(letters))
-    out = []
-    for p, k in zip(letters, key_stream):
-        out.append(ALPHA[(ALPHA.index(p) + ALPHA.index(k)) % 26])
-    return ''.join(out)
+    return _vigenere_apply(letters, key, 1)
 
 def vigenere_decrypt_letters(letters, key):
     if not letters:
         return ''
-    key_stream = _extend_key(key, len(letters))
-    out = []
-    for c, k in zip(letters, key_stream):
-        out.append(ALPHA[(ALPHA.index(c) - ALPHA.index(k)) % 26])
-    return ''.join(out)
+    return _vigenere_apply(letters, key, -1)
 
 # ---------------------------
 # Playfair helpers
 # ---------------------------
-def _make_playfair_matrix(keyword):
-    # Prepare 5x5 matrix (I/J merged -> we'll skip J)
-    used = []
+def _normalize_playfair_keyword(keyword):
+    """Reduce a keyword to the ordered unique letters that seed the matrix (J -> I).
+       Two keywords with the same normalized form produce the same 5x5 matrix.
+    """
+    seen = set()
     key_filtered = []
     for ch in keyword.upper():
         if not ch.isalpha():
             continue
-        ch = ch.upper()
         if ch == 'J':
             ch = 'I'
-        if ch not in used:
-            used.append(ch)
+        if ch not in seen:
+            seen.add(ch)
             key_filtered.append(ch)
+    return ''.join(key_filtered)
+
+def _make_playfair_matrix(keyword):
+    # Prepare 5x5 matrix (I/J merged -> we'll skip J)
+    used = list(_normalize_playfair_keyword(keyword))
+    seen = set(used)
     for ch in ALPHA:
         if ch == 'J':  # skip J
             continue
-        if ch not in used:
+        if ch not in seen:
             used.append(ch)
     # build 5x5
     matrix = [used[i*5:(i+1)*5] for i in range(5)]
@@ -129,6 +198,52 @@ def _make_playfair_matrix(keyword):
             pos[matrix[r][c]] = (r, c)
     return matrix, pos
 
+class PlayfairTable:
+    """Compiled Playfair key: every digram -> digram mapping precomputed for both directions.
+       625 entries each way, so encrypting a digram is one dict lookup instead of a
+       row/column/rectangle branch. Build through get_playfair_table() to share instances.
+    """
+
+    def __init__(self, keyword):
+        self.matrix, self.pos = _make_playfair_matrix(keyword)
+        self.encrypt_map = {}
+        self.decrypt_map = {}
+        matrix = self.matrix
+        for a, (ra, ca) in self.pos.items():
+            for b, (rb, cb) in self.pos.items():
+                if ra == rb:
+                    enc = matrix[ra][(ca+1)%5] + matrix[rb][(cb+1)%5]
+                    dec = matrix[ra][(ca-1)%5] + matrix[rb][(cb-1)%5]
+                elif ca == cb:
+                    enc = matrix[(ra+1)%5][ca] + matrix[(rb+1)%5][cb]
+                    dec = matrix[(ra-1)%5][ca] + matrix[(rb-1)%5][cb]
+                else:
+                    enc = dec = matrix[ra][cb] + matrix[rb][ca]
+                self.encrypt_map[a + b] = enc
+                self.decrypt_map[a + b] = dec
+
+    @staticmethod
+    def _substitute(text, table):
+        if len(text) % 2:
+            raise ValueError("Playfair input must have an even number of letters")
+        # text[0::2] + text[1::2] zipped back together gives the digrams in order
+        return ''.join(map(table.__getitem__, map(str.__add__, text[0::2], text[1::2])))
+
+    def encrypt_pairs(self, padded):
+        """Encrypt already-padded letters (even length, no doubled digrams)."""
+        return self._substitute(padded, self.encrypt_map)
+
+    def decrypt_pairs(self, cipherletters):
+        return self._substitute(cipherletters, self.decrypt_map)
+
+@lru_cache(maxsize=128)
+def _compile_playfair(normalized_keyword):
+    return PlayfairTable(normalized_keyword)
+
+def get_playfair_table(keyword):
+    """Return the (cached) compiled PlayfairTable for keyword."""
+    return _compile_playfair(_normalize_playfair_keyword(keyword))
+
 def _pairify_for_playfair(text):
     """Given a string of letters (A-Z with J replaced by I), insert X between repeated letters in a digram.
        Return (padded_text, filler_positions) where filler_positions are indices (0-based) in the padded_text
@@ -159,75 +274,438 @@ def _pairify_for_playfair(text):
 def playfair_encrypt(letters, keyword):
     if not letters:
         return '', []
-    matrix, pos = _make_playfair_matrix(keyword)
     padded, filler_positions = _pairify_for_playfair(letters)
-    cipher = []
-    for i in range(0, len(padded), 2):
-        a = padded[i]; b = padded[i+1]
-        ra, ca = pos[a]; rb, cb = pos[b]
-        if ra == rb:
-            cipher.append(matrix[ra][(ca+1)%5])
-            cipher.append(matrix[rb][(cb+1)%5])
-        elif ca == cb:
-            cipher.append(matrix[(ra+1)%5][ca])
-            cipher.append(matrix[(rb+1)%5][cb])
-        else:
-            cipher.append(matrix[ra][cb])
-            cipher.append(matrix[rb][ca])
-    return ''.join(cipher), filler_positions
+    return get_playfair_table(keyword).encrypt_pairs(padded), filler_positions
 
 def playfair_decrypt(cipherletters, keyword):
     if not cipherletters:
         return ''
-    matrix, pos = _make_playfair_matrix(keyword)
-    # need inverse lookup for matrix by coordinates
-    out = []
-    for i in range(0, len(cipherletters), 2):
-        a = cipherletters[i]; b = cipherletters[i+1]
-        ra, ca = pos[a]; rb, cb = pos[b]
-        if ra == rb:
-            out.append(matrix[ra][(ca-1)%5])
-            out.append(matrix[rb][(cb-1)%5])
-        elif ca == cb:
-            out.append(matrix[(ra-1)%5][ca])
-            out.append(matrix[(rb-1)%5][cb])
-        else:
-            out.append(matrix[ra][cb])
-            out.append(matrix[rb][ca])
-    return ''.join(out)
+    return get_playfair_table(keyword).decrypt_pairs(cipherletters)
+
+# ---------------------------
+# Metadata encoding
+# ---------------------------
+# Legacy metadata (no 'version' key) stores every position as a JSON number and every
+# non-alpha char as an [index, char] pair, which for prose outweighs the ciphertext.
+# Version 2 stores each ascending position list as base64 of LEB128 varint gaps
+# (gap = index - previous index - 1, so runs of adjacent positions cost one 0x00 byte each),
+# and the non-alpha chars as one plain string.
+METADATA_VERSION = 2
+_PACKED_POSITION_KEYS = ('j_positions', 'filler_positions', 'vigenere_j_positions')
+
+def _pack_positions(positions):
+    out = bytearray()
+    prev = -1
+    for p in positions:
+        gap = p - prev - 1
+        if gap < 0:
+            raise ValueError("positions must be strictly ascending")
+        while gap >= 0x80:
+            out.append((gap & 0x7f) | 0x80)
+            gap >>= 7
+        out.append(gap)
+        prev = p
+    return base64.b64encode(bytes(out)).decode('ascii')
+
+def _unpack_positions(packed):
+    positions = []
+    prev = -1
+    gap = 0
+    shift = 0
+    for byte in base64.b64decode(packed):
+        gap |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        prev += gap + 1
+        positions.append(prev)
+        gap = 0
+        shift = 0
+    return positions
+
+def pack_metadata(metadata):
+    """Convert metadata from encrypt_note into the compact version-2 form (JSON-safe)."""
+    if metadata.get('version') == METADATA_VERSION:
+        return metadata
+    non_alpha = metadata['non_alpha_positions']
+    packed = {
+        'version': METADATA_VERSION,
+        'original_length': metadata['original_length'],
+        'letters_length_before_padding': metadata['letters_length_before_padding'],
+        'non_alpha_positions': _pack_positions([idx for idx, _ in non_alpha]),
+        'non_alpha_chars': ''.join([ch for _, ch in non_alpha]),
+    }
+    for key in _PACKED_POSITION_KEYS:
+        packed[key] = _pack_positions(metadata.get(key, []))
+    return packed
+
+def unpack_metadata(metadata):
+    """Return metadata in the expanded form decrypt_note works on; legacy dicts pass through."""
+    version = metadata.get('version')
+    if version is None:
+        return metadata
+    if version != METADATA_VERSION:
+        raise ValueError(f"Unsupported metadata version: {version}")
+    non_alpha_idx = _unpack_positions(metadata['non_alpha_positions'])
+    non_alpha_chars = metadata['non_alpha_chars']
+    if len(non_alpha_idx) != len(non_alpha_chars):
+        raise ValueError("Corrupted metadata: non-alpha positions and chars differ in length")
+    unpacked = {
+        'original_length': metadata['original_length'],
+        'letters_length_before_padding': metadata['letters_length_before_padding'],
+        'non_alpha_positions': list(zip(non_alpha_idx, non_alpha_chars)),
+    }
+    for key in _PACKED_POSITION_KEYS:
+        unpacked[key] = _unpack_positions(metadata.get(key, ''))
+    return unpacked
+
+# ---------------------------
+# Optional NumPy backend
+# ---------------------------
+# Letters become uint8 arrays (A=0 .. Z=25): Caesar+Vigenere is one modular add against the
+# tiled key, Playfair is a gather through 26x26 digram tables, and filler insertion only loops
+# over the (rare) positions where two adjacent letters are equal. encrypt_note/decrypt_note
+# switch to it automatically for texts of at least NUMPY_THRESHOLD characters when NumPy is
+# installed. Anything unusual (non A-Z letters, odd metadata) returns None and the pure-Python
+# path handles it, so results are always identical.
+NUMPY_THRESHOLD = 4096
+_J = ALPHA.index('J')
+_I = ALPHA.index('I')
+_X = ALPHA.index('X')
+
+@lru_cache(maxsize=128)
+def _numpy_playfair_tables(normalized_keyword):
+    """26x26 uint8 tables (first/second output letter) for encrypt and decrypt, or None if the
+       keyword leaves some A-Z (minus J) digram without an entry."""
+    table = _compile_playfair(normalized_keyword)
+    if any(ch not in table.pos for ch in ALPHA if ch != 'J'):
+        return None
+    tables = np.zeros((4, 26, 26), dtype=np.uint8)
+    for pair, enc in table.encrypt_map.items():
+        if pair[0] not in ALPHA or pair[1] not in ALPHA:
+            continue
+        a, b = ord(pair[0]) - 65, ord(pair[1]) - 65
+        dec = table.decrypt_map[pair]
+        tables[:, a, b] = (ord(enc[0]) - 65, ord(enc[1]) - 65, ord(dec[0]) - 65, ord(dec[1]) - 65)
+    return tables
+
+def _numpy_key_stream(caesar_shift, vigenere_key, length):
+    """(caesar + key[i % period]) % 26 for i < length, as uint8."""
+    key = np.array([(ALPHA.index(k) + caesar_shift) % 26 for k in _normalize_key(vigenere_key)], dtype=np.uint8)
+    return np.tile(key, -(-length // len(key)))[:length]
+
+def _numpy_codes(text):
+    try:
+        return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    except UnicodeEncodeError:
+        return None
+
+def _encrypt_note_numpy(plaintext, caesar_shift, vigenere_key, playfair_keyword):
+    codes = _numpy_codes(plaintext)
+    if codes is None:
+        return None
+    upper = codes & 0xFFDF
+    is_letter = (codes < 128) & (upper >= 65) & (upper <= 90)
+    non_ascii = codes >= 128
+    if non_ascii.any() and any(chr(c).isalpha() for c in np.unique(codes[non_ascii]).tolist()):
+        return None
+    tables = _numpy_playfair_tables(_normalize_playfair_keyword(playfair_keyword))
+    if tables is None:
+        return None
+    letters = (upper[is_letter] - 65).astype(np.uint8)
+    n = len(letters)
+    try:
+        key_stream = _numpy_key_stream(caesar_shift, vigenere_key, n) if n else np.zeros(0, dtype=np.uint8)
+    except ValueError:
+        return None
+    j_positions = np.flatnonzero(letters == _J)
+    letters[j_positions] = _I
+    shifted = (letters + key_stream) % 26
+    vigenere_j_positions = np.flatnonzero(shifted == _J)
+    shifted[vigenere_j_positions] = _I
+
+    # Pairing is sequential, but it only branches where shifted[e] == shifted[e+1]: a digram
+    # starting at such an e gets a filler and shifts every later digram by one letter.
+    filler_after = []
+    start = 0
+    for e in np.flatnonzero(shifted[:-1] == shifted[1:]).tolist():
+        if e >= start and (e - start) % 2 == 0:
+            filler_after.append(e)
+            start = e + 1
+    if (n - start) % 2:
+        filler_after.append(n - 1)
+    filler_after = np.array(filler_after, dtype=np.int64)
+    padded = np.insert(shifted, filler_after + 1, _X)
+    filler_positions = filler_after + 1 + np.arange(len(filler_after))
+
+    pairs = padded.reshape(-1, 2)
+    cipher = np.empty_like(padded)
+    cipher[0::2] = tables[0][pairs[:, 0], pairs[:, 1]]
+    cipher[1::2] = tables[1][pairs[:, 0], pairs[:, 1]]
+
+    non_alpha_idx = np.flatnonzero(~is_letter)
+    non_alpha_chars = codes[non_alpha_idx].tobytes().decode('utf-32-le')
+    metadata = {
+        'non_alpha_positions': list(zip(non_alpha_idx.tolist(), non_alpha_chars)),
+        'j_positions': j_positions.tolist(),
+        'filler_positions': filler_positions.tolist(),
+        'vigenere_j_positions': vigenere_j_positions.tolist(),
+        'original_length': len(plaintext),
+        'letters_length_before_padding': n
+    }
+    return (cipher + 65).tobytes().decode('ascii'), metadata
+
+def _numpy_positions(positions, length):
+    """In-range positions as an int64 array (out-of-range ones are ignored, as in the pure path)."""
+    arr = np.asarray(positions, dtype=np.int64).reshape(-1)
+    return arr[(arr >= 0) & (arr < length)]
+
+def _decrypt_note_numpy(ciphertext_letters, caesar_shift, vigenere_key, playfair_keyword, metadata):
+    if len(ciphertext_letters) % 2:
+        return None
+    tables = _numpy_playfair_tables(_normalize_playfair_keyword(playfair_keyword))
+    if tables is None:
+        return None
+    try:
+        cipher = np.frombuffer(ciphertext_letters.encode('ascii'), dtype=np.uint8) - 65
+    except UnicodeEncodeError:
+        return None
+    if cipher.size and (cipher.max() > 25 or (cipher == _J).any()):
+        return None
+    pairs = cipher.reshape(-1, 2)
+    padded = np.empty_like(cipher)
+    padded[0::2] = tables[2][pairs[:, 0], pairs[:, 1]]
+    padded[1::2] = tables[3][pairs[:, 0], pairs[:, 1]]
+    letters = np.delete(padded, _numpy_positions(metadata['filler_positions'], len(padded)))
+    letters[_numpy_positions(metadata.get('vigenere_j_positions', []), len(letters))] = _J
+    n = len(letters)
+    try:
+        key_stream = _numpy_key_stream(caesar_shift, vigenere_key, n) if n else np.zeros(0, dtype=np.uint8)
+    except ValueError:
+        return None
+    letters = (letters.astype(np.int16) - key_stream) % 26
+    letters[_numpy_positions(metadata.get('j_positions', []), n)] = _J
+
+    original_length = metadata['original_length']
+    non_alpha = metadata['non_alpha_positions']
+    non_alpha_idx = np.fromiter(map(itemgetter(0), non_alpha), dtype=np.int64, count=len(non_alpha))
+    if (non_alpha_idx.size and (non_alpha_idx[0] < 0 or non_alpha_idx[-1] >= original_length
+                                or (np.diff(non_alpha_idx) <= 0).any())
+            or original_length - len(non_alpha) != n):
+        # shuffled/duplicate positions or a letter count mismatch: leave it to the pure path
+        return None
+    out = np.empty(original_length, dtype=np.uint32)
+    is_letter = np.ones(original_length, dtype=bool)
+    is_letter[non_alpha_idx] = False
+    out[is_letter] = letters + 65
+    out[non_alpha_idx] = np.frombuffer(''.join(map(itemgetter(1), non_alpha)).encode('utf-32-le'), dtype=np.uint32)
+    return out.tobytes().decode('utf-32-le')
 
 # ---------------------------
 # Pipeline: Encrypt / Decrypt note
 # ---------------------------
-def encrypt_note(plaintext, caesar_shift, vigenere_key, playfair_keyword):
+def _encrypt_note_staged(plaintext, caesar_shift, vigenere_key, playfair_keyword):
     letters, non_alpha_positions, j_positions, original_length = _record_non_alpha_and_letters(plaintext)
     # Caesar
     after_caesar = caesar_encrypt_letters(letters, caesar_shift)
     # Vigenere
     after_vig = vigenere_encrypt_letters(after_caesar, vigenere_key)
-    # Playfair (pad -> encrypt)
+    # Playfair has no J: fold Vigenere output J -> I and remember where, so decrypt can undo it
+    vigenere_j_positions = [i for i, ch in enumerate(after_vig) if ch == 'J']
+    after_vig = after_vig.replace('J', 'I')
+    # Playfair (pad -> encrypt). Encrypt the padded digrams directly: padding them a second
+    # time (as playfair_encrypt would) splits an 'X' + filler 'X' pair and breaks decryption.
     padded_for_playfair, filler_positions = _pairify_for_playfair(after_vig)
-    cipher_playfair, _ = playfair_encrypt(padded_for_playfair, playfair_keyword)  # playfair_encrypt also returns filler positions, but we've recorded them already
+    cipher_playfair = get_playfair_table(playfair_keyword).encrypt_pairs(padded_for_playfair)
     # store metadata needed for perfect reversal
     metadata = {
         'original_length': original_length,
         'non_alpha_positions': non_alpha_positions,    # list of (idx,char)
         'j_positions': j_positions,                    # within letters (pre-padding)
         'filler_positions': filler_positions,          # indices in padded_for_playfair where 'X' was inserted
-        'letters_length_before_padding': len(after_vig)
+        'letters_length_before_padding': len(after_vig),
+        'vigenere_j_positions': vigenere_j_positions   # within Vigenere output, folded to I for Playfair
     }
     return cipher_playfair, metadata
 
-def decrypt_note(ciphertext_letters, caesar_shift, vigenere_key, playfair_keyword, metadata):
+@lru_cache(maxsize=128)
+def _combined_shift_maps(caesar_shift, normalized_key):
+    """One dict per Vigenere key letter mapping a raw plaintext letter (either case, J -> I)
+       straight to its Caesar+Vigenere shifted form.
+    """
+    maps = []
+    for k in normalized_key:
+        table = _shift_table(caesar_shift + ALPHA.index(k))
+        m = {}
+        for ch in ALPHA:
+            src = 'I' if ch == 'J' else ch
+            m[ch] = m[ch.lower()] = chr(table[ord(src)])
+        maps.append(m)
+    return maps
+
+_METADATA_LIST_KEYS = ('non_alpha_positions', 'j_positions', 'filler_positions', 'vigenere_j_positions')
+
+def _empty_metadata_delta():
+    return {key: [] for key in _METADATA_LIST_KEYS}
+
+def merge_metadata(metadata, delta):
+    """Fold one metadata delta from encrypt_note_stream into metadata (in place) and return it."""
+    for key, value in delta.items():
+        if key in _METADATA_LIST_KEYS:
+            metadata.setdefault(key, []).extend(value)
+        else:
+            metadata[key] = value
+    return metadata
+
+class _NoteEncryptor:
+    """Fused Caesar+Vigenere+Playfair pass that can be fed the plaintext in pieces.
+       Letter count, Vigenere key offset and a pending half-digram carry over between feed()
+       calls, so chunk boundaries never change the output.
+    """
+
+    def __init__(self, caesar_shift, vigenere_key, playfair_keyword):
+        try:
+            self.maps = _combined_shift_maps(caesar_shift, _normalize_key(vigenere_key))
+            self.key_error = None
+        except ValueError as e:
+            # a bad key only matters once a letter shows up (same as the staged pipeline)
+            self.maps = None
+            self.key_error = e
+        self.enc = get_playfair_table(playfair_keyword).encrypt_map
+        self.position = 0
+        self.n_letters = 0
+        self.ki = 0
+        self.padded_len = 0
+        self.pending = None
+
+    def feed(self, chunk):
+        """Consume the next piece of plaintext; return (cipher_chunk, metadata_delta)."""
+        delta = _empty_metadata_delta()
+        non_alpha_positions = delta['non_alpha_positions']
+        if self.maps is None:
+            for idx, ch in enumerate(chunk, self.position):
+                if ch.isalpha():
+                    raise self.key_error
+                non_alpha_positions.append((idx, ch))
+            self.position += len(chunk)
+            return '', delta
+        j_positions = delta['j_positions']
+        vigenere_j_positions = delta['vigenere_j_positions']
+        filler_positions = delta['filler_positions']
+        maps = self.maps
+        enc = self.enc
+        period = len(maps)
+        out = []
+        n_letters = self.n_letters
+        ki = self.ki
+        padded_len = self.padded_len
+        pending = self.pending
+        for idx, ch in enumerate(chunk, self.position):
+            c = maps[ki].get(ch)
+            if c is None:
+                if not ch.isalpha():
+                    non_alpha_positions.append((idx, ch))
+                    continue
+                ch = ch.upper()
+                if ch not in maps[ki]:
+                    raise ValueError(f"Unsupported letter {ch!r}: only A-Z can be encrypted")
+                c = maps[ki][ch]
+            if ch == 'J' or ch == 'j':
+                j_positions.append(n_letters)
+            if c == 'J':
+                vigenere_j_positions.append(n_letters)
+                c = 'I'
+            n_letters += 1
+            ki += 1
+            if ki == period:
+                ki = 0
+            if pending is None:
+                pending = c
+            elif pending != c:
+                out.append(enc[pending + c])
+                padded_len += 2
+                pending = None
+            else:
+                out.append(enc[pending + 'X'])
+                filler_positions.append(padded_len + 1)
+                padded_len += 2
+        self.position += len(chunk)
+        self.n_letters = n_letters
+        self.ki = ki
+        self.padded_len = padded_len
+        self.pending = pending
+        return ''.join(out), delta
+
+    def finish(self):
+        """Flush the last half-digram; the delta also carries the length totals."""
+        delta = _empty_metadata_delta()
+        cipher = ''
+        if self.pending is not None:
+            cipher = self.enc[self.pending + 'X']
+            delta['filler_positions'].append(self.padded_len + 1)
+            self.padded_len += 2
+            self.pending = None
+        delta['original_length'] = self.position
+        delta['letters_length_before_padding'] = self.n_letters
+        return cipher, delta
+
+def _encrypt_note_fused(plaintext, caesar_shift, vigenere_key, playfair_keyword):
+    """Single pass over plaintext: record non-alpha/J metadata, apply the combined
+       Caesar+Vigenere shift, pad and Playfair-substitute each digram as soon as it is complete.
+       Returns None for letters outside A-Z so the staged pipeline can handle (or reject) them.
+    """
+    try:
+        encryptor = _NoteEncryptor(caesar_shift, vigenere_key, playfair_keyword)
+        cipher, metadata = encryptor.feed(plaintext)
+        tail, final = encryptor.finish()
+    except (ValueError, KeyError):
+        return None
+    merge_metadata(metadata, final)
+    return cipher + tail, metadata
+
+def encrypt_note(plaintext, caesar_shift, vigenere_key, playfair_keyword, fused=True):
+    """Caesar -> Vigenere -> Playfair. Returns (ciphertext, metadata).
+       fused=True runs the single-pass pipeline (the NumPy backend for large texts when
+       available); fused=False (or inputs the fused pass hands back) runs the original
+       stage-by-stage pipeline. All of them give identical results.
+    """
+    if fused and np is not None and len(plaintext) >= NUMPY_THRESHOLD:
+        result = _encrypt_note_numpy(plaintext, caesar_shift, vigenere_key, playfair_keyword)
+        if result is not None:
+            return result
+    if fused:
+        result = _encrypt_note_fused(plaintext, caesar_shift, vigenere_key, playfair_keyword)
+        if result is not None:
+            return result
+    return _encrypt_note_staged(plaintext, caesar_shift, vigenere_key, playfair_keyword)
+
+def decrypt_playfair_stage(ciphertext_letters, playfair_keyword, metadata):
+    """Undo the Playfair stage of a note: decrypt, drop the fillers and restore the J's that were
+       folded to I, giving the Vigenere output. metadata must already be unpacked.
+    """
     # 1) Playfair decrypt -> yields padded letters
     padded_letters = playfair_decrypt(ciphertext_letters, playfair_keyword)
     # 2) Remove filler characters using metadata filler_positions (remove from padded_letters)
-    # Remove in descending order of indices to avoid shifting
-    padded_list = list(padded_letters)
-    for idx in sorted(metadata['filler_positions'], reverse=True):
-        if 0 <= idx < len(padded_list):
-            padded_list.pop(idx)
-    after_vig = ''.join(padded_list)
+    after_vig = drop_positions(padded_letters, metadata['filler_positions'])
+    # Undo the J -> I fold applied to the Vigenere output before Playfair
+    vigenere_j_positions = metadata.get('vigenere_j_positions', [])
+    if vigenere_j_positions:
+        unpadded_list = list(after_vig)
+        for pos in vigenere_j_positions:
+            if 0 <= pos < len(unpadded_list):
+                unpadded_list[pos] = 'J'
+        after_vig = ''.join(unpadded_list)
+    return after_vig
+
+def decrypt_note(ciphertext_letters, caesar_shift, vigenere_key, playfair_keyword, metadata):
+    # Accept both legacy and compact (pack_metadata) metadata
+    metadata = unpack_metadata(metadata)
+    if np is not None and len(ciphertext_letters) >= NUMPY_THRESHOLD:
+        plaintext = _decrypt_note_numpy(ciphertext_letters, caesar_shift, vigenere_key, playfair_keyword, metadata)
+        if plaintext is not None:
+            return plaintext
+    # 1-2) Playfair decrypt, remove fillers, restore the Vigenere output's J's
+    after_vig = decrypt_playfair_stage(ciphertext_letters, playfair_keyword, metadata)
     # Check length matches expected
     if len(after_vig) != metadata['letters_length_before_padding']:
         # something went wrong, but continue best-effort
@@ -237,13 +715,175 @@ def decrypt_note(ciphertext_letters, caesar_shift, vigenere_key, playfair_keywor
     # 4) Caesar decrypt
     letters_only = caesar_decrypt_letters(after_caesar, caesar_shift)
     # At this point letters_only is the original letters with I used where J might have been.
-    # Restore J's at recorded j_positions
-    letters_list = list(letters_only)
-    for pos in metadata.get('j_positions', []):
-        if 0 <= pos < len(letters_list):
-            letters_list[pos] = 'J'
-    letters_only_restored = ''.join(letters_list)
-    # 5) Reinsert non-alpha characters into original positions
-    plaintext_reconstructed = _reinsert_non_alpha(metadata['original_length'], letters_only_restored, metadata['non_alpha_positions'], [])
-    # Note: we passed empty j_positions to _reinsert_non_alpha because we already restored J's above.
+    # 5) Restore J's at recorded j_positions and reinsert non-alpha characters into original positions
+    plaintext_reconstructed = _reinsert_non_alpha(metadata['original_length'], letters_only, metadata['non_alpha_positions'], metadata.get('j_positions', []))
     return plaintext_reconstructed
+
+# ---------------------------
+# Batch: many notes per call
+# ---------------------------
+BATCH_CHUNK_SIZE = 64
+# Starting a pool and shipping notes to it costs ~30 ms plus ~0.1 ms per 2.4 KB note, against
+# ~0.5 ms to encrypt that note, so with the default max_workers a batch only fans out once it
+# holds this many characters (about 200 such notes); smaller batches run in-process.
+BATCH_PARALLEL_MIN_CHARS = 512 * 1024
+
+def _run_jobs(fn, jobs):
+    return [fn(*job) for job in jobs]
+
+def _run_batch(fn, jobs, max_workers, chunk_size):
+    """Run fn(*job) for every job and return the results in job order.
+       Jobs are sorted by their key fields (job[1:4]) first, so each chunk handed to a worker
+       is mostly one key set and hits that process's compiled-table caches.
+    """
+    jobs = list(jobs)
+    order = sorted(range(len(jobs)), key=lambda i: jobs[i][1:4])
+    if max_workers is None:
+        total_chars = sum(len(job[0]) for job in jobs)
+        max_workers = (os.cpu_count() or 1) if total_chars >= BATCH_PARALLEL_MIN_CHARS else 1
+    chunk_size = max(1, chunk_size)
+    if max_workers <= 1 or len(jobs) <= chunk_size:
+        grouped = _run_jobs(fn, [jobs[i] for i in order])
+    else:
+        chunks = [[jobs[i] for i in order[start:start + chunk_size]]
+                  for start in range(0, len(order), chunk_size)]
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            grouped = [result
+                       for chunk_results in pool.map(_run_jobs, [fn] * len(chunks), chunks)
+                       for result in chunk_results]
+    results = [None] * len(jobs)
+    for i, result in zip(order, grouped):
+        results[i] = result
+    return results
+
+def encrypt_notes_batch(jobs, max_workers=None, chunk_size=BATCH_CHUNK_SIZE):
+    """Encrypt many notes. jobs: iterable of (plaintext, caesar_shift, vigenere_key, playfair_keyword).
+       Returns a list of (ciphertext, metadata) in job order. Batches larger than chunk_size are
+       spread over a process pool of max_workers; max_workers=1 stays in-process. The default uses
+       every CPU once the batch holds BATCH_PARALLEL_MIN_CHARS characters, and one process below that.
+    """
+    return _run_batch(encrypt_note, jobs, max_workers, chunk_size)
+
+def decrypt_notes_batch(jobs, max_workers=None, chunk_size=BATCH_CHUNK_SIZE):
+    """Decrypt many notes. jobs: iterable of (ciphertext, caesar_shift, vigenere_key, playfair_keyword, metadata).
+       Returns a list of plaintexts in job order; see encrypt_notes_batch for the pool options.
+    """
+    return _run_batch(decrypt_note, jobs, max_workers, chunk_size)
+
+# ---------------------------
+# Streaming: Encrypt / Decrypt note in chunks
+# ---------------------------
+def encrypt_note_stream(chunks, caesar_shift, vigenere_key, playfair_keyword):
+    """Generator form of encrypt_note for text that should not be held in memory at once.
+       Yields (cipher_chunk, metadata_delta) per input chunk, then one final pair whose delta
+       also holds 'original_length' and 'letters_length_before_padding'. Positions in the
+       deltas are absolute; joining the cipher chunks and folding the deltas with
+       merge_metadata() gives exactly what encrypt_note returns for the joined text.
+       Letters outside A-Z raise ValueError (encrypt_note falls back to the staged pipeline).
+    """
+    encryptor = _NoteEncryptor(caesar_shift, vigenere_key, playfair_keyword)
+    for chunk in chunks:
+        yield encryptor.feed(chunk)
+    yield encryptor.finish()
+
+class _NoteDecryptor:
+    """Inverse of _NoteEncryptor: walks the ciphertext in pieces, keeping cursors into the
+       (sorted) metadata position lists instead of materializing the whole padded text.
+    """
+
+    def __init__(self, caesar_shift, vigenere_key, playfair_keyword, metadata):
+        metadata = unpack_metadata(metadata)
+        self.caesar_shift = caesar_shift
+        self.vigenere_key = vigenere_key
+        self.key = None
+        self.table = get_playfair_table(playfair_keyword)
+        self.original_length = metadata['original_length']
+        self.fillers = sorted(metadata['filler_positions'])
+        self.vigenere_j = sorted(metadata.get('vigenere_j_positions', []))
+        self.j_positions = sorted(metadata.get('j_positions', []))
+        self.non_alpha = sorted(metadata['non_alpha_positions'], key=itemgetter(0))
+        self.cursors = {'fillers': 0, 'vigenere_j': 0, 'j_positions': 0, 'non_alpha': 0}
+        self.carry = ''
+        self.padded_pos = 0
+        self.letter_pos = 0
+        self.out_pos = 0
+
+    def _take(self, name, start, end):
+        """Positions from the named list that fall in [start, end), made relative to start."""
+        positions = getattr(self, name)
+        i = self.cursors[name]
+        local = []
+        while i < len(positions) and positions[i] < end:
+            if positions[i] >= start:
+                local.append(positions[i] - start)
+            i += 1
+        self.cursors[name] = i
+        return local
+
+    @staticmethod
+    def _set_j(letters, positions):
+        if not positions:
+            return letters
+        letters_list = list(letters)
+        for pos in positions:
+            letters_list[pos] = 'J'
+        return ''.join(letters_list)
+
+    def _emit(self, letters):
+        """Merge decrypted letters with the non-alpha chars that belong before/between them."""
+        pieces = []
+        non_alpha = self.non_alpha
+        i = self.cursors['non_alpha']
+        li = 0
+        while True:
+            while i < len(non_alpha) and non_alpha[i][0] <= self.out_pos:
+                pieces.append(non_alpha[i][1])
+                i += 1
+                self.out_pos += 1
+            if li == len(letters) or self.out_pos >= self.original_length:
+                break
+            nxt = non_alpha[i][0] if i < len(non_alpha) else self.original_length
+            take = min(nxt - self.out_pos, len(letters) - li)
+            pieces.append(letters[li:li + take])
+            li += take
+            self.out_pos += take
+        self.cursors['non_alpha'] = i
+        return ''.join(pieces)
+
+    def feed(self, chunk):
+        text = self.carry + chunk
+        cut = len(text) - len(text) % 2
+        self.carry = text[cut:]
+        padded = self.table.decrypt_pairs(text[:cut])
+        if not padded:
+            return ''
+        start = self.padded_pos
+        self.padded_pos += len(padded)
+        letters = drop_positions(padded, self._take('fillers', start, self.padded_pos))
+        start = self.letter_pos
+        self.letter_pos += len(letters)
+        letters = self._set_j(letters, self._take('vigenere_j', start, self.letter_pos))
+        if self.key is None:
+            self.key = _normalize_key(self.vigenere_key)
+        offset = start % len(self.key)
+        letters = vigenere_decrypt_letters(letters, self.key[offset:] + self.key[:offset])
+        letters = caesar_decrypt_letters(letters, self.caesar_shift)
+        letters = self._set_j(letters, self._take('j_positions', start, self.letter_pos))
+        return self._emit(letters)
+
+    def finish(self):
+        if self.carry:
+            raise ValueError("Playfair input must have an even number of letters")
+        # trailing non-alpha chars (and any the letters never reached)
+        tail = [ch for idx, ch in self.non_alpha[self.cursors['non_alpha']:] if idx < self.original_length]
+        self.cursors['non_alpha'] = len(self.non_alpha)
+        return ''.join(tail)
+
+def decrypt_note_stream(cipher_chunks, caesar_shift, vigenere_key, playfair_keyword, metadata):
+    """Generator form of decrypt_note: yields plaintext chunks as ciphertext chunks arrive.
+       Chunks may split digrams anywhere. metadata is the full (legacy or packed) metadata.
+    """
+    decryptor = _NoteDecryptor(caesar_shift, vigenere_key, playfair_keyword, metadata)
+    for chunk in cipher_chunks:
+        yield decryptor.feed(chunk)
+    yield decryptor.finish()
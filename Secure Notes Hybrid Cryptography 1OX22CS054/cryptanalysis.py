@@ -0,0 +1,303 @@
+# cryptanalysis.py
+# Key recovery for auditing notes encrypted with weak keys.
+#   - Caesar: try all 26 shifts, rank by chi-squared against English letter frequencies.
+#   - Vigenere: period from index of coincidence, each column's shift from chi-squared
+#     (or straight from a known plaintext crib).
+#   - Playfair: hill climbing over 5x5 key squares with quadgram fitness (standalone Playfair).
+#   - audit_note: dictionary search over Playfair keywords for a stored note, each candidate
+#     followed by Vigenere recovery, spread over a process pool with early termination.
+# Caesar and Vigenere compose into a single Vigenere, so a recovered note key is reported as
+# caesar_shift=0 plus the combined Vigenere key; it decrypts through ciphers.decrypt_note.
+
+import math, os, random, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from ciphers import (ALPHA, caesar_decrypt_letters, vigenere_decrypt_letters, playfair_decrypt,
+                     decrypt_note, decrypt_playfair_stage, unpack_metadata)
+
+# Relative letter frequencies of English text (A-Z, percent)
+ENGLISH_FREQ = [8.167, 1.492, 2.782, 4.253, 12.702, 2.228, 2.015, 6.094, 6.966, 0.153, 0.772, 4.025, 2.406,
+                6.749, 7.507, 1.929, 0.095, 5.987, 6.327, 9.056, 2.758, 0.978, 2.360, 0.150, 1.974, 0.074]
+
+# Built-in quadgram source so the module works offline; pass a real quadgram table
+# (load_quadgrams) for better Playfair results.
+_SAMPLE_TEXT = """
+It was the best of times and the worst of times for the people who lived in the old town by the river.
+Every morning the market opened before the sun had risen over the hills, and the traders called out
+the prices of their bread, fish and vegetables. The children ran between the stalls while their parents
+talked about the weather, the harvest and the news that had come from the city. Nobody knew exactly when
+the letter had arrived, but by the evening everyone had heard that the council would meet to discuss the
+plans for the new bridge. Some of the older men thought that it would bring trade and work for the young,
+while others were afraid that strangers would come and change the quiet life they had always known.
+The meeting was held in the hall next to the church, and there were so many people that some of them had
+to stand outside and listen through the open windows. The mayor spoke first and explained that the money
+for the bridge would be provided by the government, and that the work would begin in the spring. Then the
+schoolteacher stood up and asked whether anyone had thought about what would happen to the ferry and the
+family who had run it for three generations. There was a long silence before anyone answered her question.
+Please remember to send the report to the office before the end of the week, and keep a copy of the
+meeting notes for the records. The password for the shared account will change on the first of the month.
+"""
+
+def _letters_only(text):
+    return ''.join(ch for ch in text.upper() if 'A' <= ch <= 'Z')
+
+def _letter_counts(letters):
+    return [letters.count(ch) for ch in ALPHA]
+
+def chi_squared(letters):
+    """Chi-squared distance of the letter distribution from English (lower is more English-like)."""
+    n = len(letters)
+    if not n:
+        return float('inf')
+    total = 0.0
+    for count, freq in zip(_letter_counts(letters), ENGLISH_FREQ):
+        expected = n * freq / 100
+        total += (count - expected) ** 2 / expected
+    return total
+
+def index_of_coincidence(letters):
+    n = len(letters)
+    if n < 2:
+        return 0.0
+    return sum(c * (c - 1) for c in _letter_counts(letters)) / (n * (n - 1))
+
+class QuadgramScorer:
+    """log10 quadgram probabilities; score() is the mean over all quadgrams in the text,
+       so texts of different lengths are comparable."""
+
+    def __init__(self, counts):
+        total = sum(counts.values())
+        self.logp = {q: math.log10(c / total) for q, c in counts.items()}
+        self.floor = math.log10(0.01 / total)
+
+    @classmethod
+    def from_text(cls, text):
+        letters = _letters_only(text)
+        counts = {}
+        for i in range(len(letters) - 3):
+            q = letters[i:i + 4]
+            counts[q] = counts.get(q, 0) + 1
+        return cls(counts)
+
+    def score(self, letters):
+        n = len(letters) - 3
+        if n <= 0:
+            return self.floor
+        get = self.logp.get
+        floor = self.floor
+        return sum(get(letters[i:i + 4], floor) for i in range(n)) / n
+
+def load_quadgrams(path):
+    """Read a 'QUAD COUNT' per line quadgram file (e.g. english_quadgrams.txt)."""
+    counts = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 2:
+                counts[parts[0].upper()] = int(parts[1])
+    return QuadgramScorer(counts)
+
+@lru_cache(maxsize=1)
+def default_scorer():
+    return QuadgramScorer.from_text(_SAMPLE_TEXT)
+
+# ---------------------------
+# Caesar
+# ---------------------------
+def crack_caesar(letters):
+    """All 26 shifts as (chi_squared, shift, plaintext), best first."""
+    candidates = []
+    for shift in range(26):
+        plain = caesar_decrypt_letters(letters, shift)
+        candidates.append((chi_squared(plain), shift, plain))
+    candidates.sort()
+    return candidates
+
+# ---------------------------
+# Vigenere
+# ---------------------------
+def estimate_vigenere_period(letters, max_period=20):
+    """Candidate periods ranked by the mean IoC of their columns (English ~0.066, random ~0.038)."""
+    scores = []
+    for period in range(1, min(max_period, max(len(letters) // 2, 1)) + 1):
+        columns = [letters[i::period] for i in range(period)]
+        scores.append((sum(index_of_coincidence(c) for c in columns) / period, period))
+    scores.sort(reverse=True)
+    return [period for _, period in scores]
+
+def _best_column_shift(column):
+    return min(range(26), key=lambda s: chi_squared(caesar_decrypt_letters(column, s)))
+
+def crack_vigenere(letters, max_period=20, tries=3, scorer=None):
+    """Recover a Vigenere key: (key, plaintext, fitness).
+       The top `tries` periods by IoC each get a per-column chi-squared key; the decryption
+       with the best quadgram fitness wins. Keys that are repeats of a shorter key are reduced.
+    """
+    scorer = scorer or default_scorer()
+    best = None
+    for period in estimate_vigenere_period(letters, max_period)[:tries]:
+        key = ''.join(ALPHA[_best_column_shift(letters[i::period])] for i in range(period))
+        key = _shortest_period(key)
+        plain = vigenere_decrypt_letters(letters, key)
+        fitness = scorer.score(plain)
+        if best is None or fitness > best[2]:
+            best = (key, plain, fitness)
+    return best
+
+def _shortest_period(key):
+    for p in range(1, len(key)):
+        if len(key) % p == 0 and key[:p] * (len(key) // p) == key:
+            return key[:p]
+    return key
+
+def vigenere_key_from_known_plaintext(cipher_letters, plain_letters, max_period=20):
+    """Known-plaintext attack: the key stream is cipher - plain; return its shortest period
+       (up to max_period) that is consistent with the whole crib, or None."""
+    n = min(len(cipher_letters), len(plain_letters))
+    stream = ''.join(ALPHA[(ALPHA.index(c) - ALPHA.index(p)) % 26]
+                     for c, p in zip(cipher_letters[:n], plain_letters[:n]))
+    for period in range(1, min(max_period, n) + 1):
+        if all(stream[i] == stream[i % period] for i in range(n)):
+            return stream[:period]
+    return None
+
+# ---------------------------
+# Playfair
+# ---------------------------
+def _mutate_square(square, rng):
+    square = list(square)
+    r = rng.random()
+    if r < 0.9:
+        i, j = rng.sample(range(25), 2)
+        square[i], square[j] = square[j], square[i]
+    elif r < 0.95:
+        rows = [square[i*5:(i+1)*5] for i in range(5)]
+        a, b = rng.sample(range(5), 2)
+        rows[a], rows[b] = rows[b], rows[a]
+        square = [ch for row in rows for ch in row]
+    else:
+        cols = list(range(5))
+        a, b = rng.sample(cols, 2)
+        for r_ in range(5):
+            square[r_*5 + a], square[r_*5 + b] = square[r_*5 + b], square[r_*5 + a]
+    return ''.join(square)
+
+def crack_playfair(cipherletters, scorer=None, iterations=40000, restarts=3, start_temp=10.0, seed=None):
+    """Simulated-annealing hill climb over 5x5 squares for a standalone Playfair ciphertext.
+       Acceptance works on the summed log10 fitness, cooling linearly from start_temp to 0.
+       Returns (key_square, plaintext, fitness); key_square is a 25-letter keyword that
+       playfair_decrypt accepts as-is."""
+    scorer = scorer or default_scorer()
+    rng = random.Random(seed)
+    n_quads = max(len(cipherletters) - 3, 1)
+    base = [ch for ch in ALPHA if ch != 'J']
+    best_key, best_fit = None, None
+    for _ in range(restarts):
+        rng.shuffle(base)
+        parent = ''.join(base)
+        parent_fit = scorer.score(playfair_decrypt(cipherletters, parent))
+        for step in range(iterations):
+            temp = start_temp * (1 - step / iterations)
+            child = _mutate_square(parent, rng)
+            child_fit = scorer.score(playfair_decrypt(cipherletters, child))
+            delta = (child_fit - parent_fit) * n_quads
+            if delta >= 0 or (temp > 0 and rng.random() < math.exp(delta / temp)):
+                parent, parent_fit = child, child_fit
+                if best_fit is None or parent_fit > best_fit:
+                    best_key, best_fit = parent, parent_fit
+    return best_key, playfair_decrypt(cipherletters, best_key), best_fit
+
+# ---------------------------
+# Note audit: dictionary search over Playfair keywords
+# ---------------------------
+DEFAULT_STOP_FITNESS = -4.6
+
+def _audit_keywords(ciphertext, metadata, keywords, max_period):
+    """Worker: best (fitness, keyword, vigenere_key) over a chunk of candidate keywords."""
+    best = None
+    for keyword in keywords:
+        try:
+            # same step as decrypt_note: the combined Caesar+Vigenere letters for this keyword
+            letters = decrypt_playfair_stage(ciphertext, keyword, metadata)
+        except (KeyError, ValueError):
+            continue
+        cracked = crack_vigenere(letters, max_period)
+        if cracked and (best is None or cracked[2] > best[0]):
+            best = (cracked[2], keyword, cracked[0])
+    return best, len(keywords)
+
+def audit_note(ciphertext, metadata, keywords, max_period=12, processes=None, chunk_size=32,
+               stop_fitness=DEFAULT_STOP_FITNESS):
+    """Search candidate Playfair keywords for a stored note; for each, recover the combined
+       Caesar+Vigenere key. Stops early once a candidate reaches stop_fitness (mean log10
+       quadgram probability; None = try everything). Returns a dict with the best keys found,
+       the plaintext from ciphers.decrypt_note, and candidates/second.
+    """
+    metadata = unpack_metadata(metadata)
+    keywords = list(dict.fromkeys(keywords))
+    chunks = [keywords[i:i + chunk_size] for i in range(0, len(keywords), chunk_size)]
+    processes = processes or os.cpu_count() or 1
+    start = time.perf_counter()
+    tried = 0
+    best = None
+
+    def take(result):
+        nonlocal best, tried
+        chunk_best, count = result
+        tried += count
+        if chunk_best and (best is None or chunk_best[0] > best[0]):
+            best = chunk_best
+        return stop_fitness is not None and best is not None and best[0] >= stop_fitness
+
+    if processes <= 1:
+        for chunk in chunks:
+            if take(_audit_keywords(ciphertext, metadata, chunk, max_period)):
+                break
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(_audit_keywords, ciphertext, metadata, chunk, max_period) for chunk in chunks]
+            for future in as_completed(futures):
+                if take(future.result()):
+                    for f in futures:
+                        f.cancel()
+                    break
+    elapsed = time.perf_counter() - start
+    result = {
+        "found": best is not None,
+        "candidates_tried": tried,
+        "candidates_per_second": tried / elapsed if elapsed else float('inf'),
+        "elapsed": elapsed,
+    }
+    if best:
+        fitness, keyword, vkey = best
+        result.update({
+            "fitness": fitness,
+            "caesar_shift": 0,
+            "vigenere_key": vkey,
+            "playfair_keyword": keyword,
+            "plaintext": decrypt_note(ciphertext, 0, vkey, keyword, metadata),
+        })
+    return result
+
+if __name__ == "__main__":
+    import argparse, json, sys
+    from storage import open_store
+    parser = argparse.ArgumentParser(description="Audit a stored note for weak Playfair/Vigenere keys.")
+    parser.add_argument("note_id")
+    parser.add_argument("wordlist", help="candidate Playfair keywords, one per line")
+    parser.add_argument("--data-dir", default="data", help="the app's data directory (default: data)")
+    parser.add_argument("--backend", default=os.environ.get("NOTES_BACKEND", "sqlite"), choices=["sqlite", "json"],
+                        help="notes store to read, as NOTES_BACKEND in app.py (default: sqlite)")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    try:
+        # read-only: an audit must not create notes.db or migrate notes.json as a side effect
+        note = open_store(args.backend, args.data_dir, read_only=True).get_note(args.note_id)
+    except FileNotFoundError as e:
+        sys.exit(f"{e} (is --data-dir/--backend right?)")
+    if note is None:
+        sys.exit(f"No note with id {args.note_id!r} in the {args.backend} store under {args.data_dir}")
+    with open(args.wordlist, encoding="utf-8") as f:
+        words = [w.strip() for w in f if w.strip()]
+    report = audit_note(note["ciphertext"], note["metadata"], words, processes=args.processes)
+    print(json.dumps(report, indent=2))
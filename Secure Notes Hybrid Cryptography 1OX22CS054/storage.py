@@ -0,0 +1,237 @@
+# storage.py
+# Note storage backends for the Secure Notes app.
+# Every backend stores the same note dicts: {"id", "title", "ciphertext", "metadata"}.
+#   JsonNoteStore   - the original data/notes.json file, parsed once and cached until it changes.
+#   SqliteNoteStore - SQLite in WAL mode, indexed by note id: O(1) lookup and append,
+#                     concurrent readers never block the writer.
+
+import os, json, sqlite3, threading
+from urllib.parse import quote
+
+PAGE_SIZE = 50
+
+def _summary(note_id, title, ciphertext_length):
+    """What listings need: no ciphertext or metadata."""
+    return {"id": note_id, "title": title, "ciphertext_length": ciphertext_length or 0}
+
+class JsonNoteStore:
+    """Legacy notes.json store with an in-process cache.
+       The parsed notes and an id -> note dict are kept until the file's (mtime, size) changes,
+       so repeated reads skip the JSON parse and get_note is a dict lookup. Our own writes
+       refresh the cache directly. hits/misses count cached vs re-parsed reads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._stamp = None
+        self._notes = []
+        self._by_id = {}
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _set_cache(self, notes, stamp):
+        self._notes = notes
+        self._by_id = {n["id"]: n for n in notes}
+        self._stamp = stamp
+
+    def _load(self):
+        """Return the cached notes, re-reading the file if it changed on disk."""
+        with self._lock:
+            stamp = self._file_stamp()
+            if stamp == self._stamp and (stamp is not None or not self._notes):
+                self.hits += 1
+                return self._notes, self._by_id
+            self.misses += 1
+            if stamp is None:
+                self._set_cache([], None)
+            else:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._set_cache(json.load(f), stamp)
+            return self._notes, self._by_id
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+    def list_notes(self):
+        notes, _ = self._load()
+        return list(notes)
+
+    def list_page(self, cursor=None, limit=PAGE_SIZE):
+        """Return (summaries, next_cursor); the cursor is the list position to resume from."""
+        notes, _ = self._load()
+        start = max(cursor or 0, 0)   # a negative start would slice from the tail
+        page = notes[start:start + limit]
+        next_cursor = start + limit if start + limit < len(notes) else None
+        return [_summary(n["id"], n.get("title", ""), len(n.get("ciphertext", ""))) for n in page], next_cursor
+
+    def get_note(self, note_id):
+        _, by_id = self._load()
+        return by_id.get(note_id)
+
+    def get_notes(self, note_ids):
+        """Return {id: note} for the ids that exist."""
+        _, by_id = self._load()
+        return {i: by_id[i] for i in note_ids if i in by_id}
+
+    def add_note(self, note):
+        self.add_notes([note])
+
+    def add_notes(self, new_notes):
+        with self._lock:
+            notes, _ = self._load()
+            notes = notes + list(new_notes)
+            self._save(notes)
+            self._set_cache(notes, self._file_stamp())
+
+    def _save(self, notes):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(notes, f, indent=2)
+
+class SqliteNoteStore:
+    def __init__(self, path, read_only=False):
+        """read_only opens an existing database without creating, altering or writing to it."""
+        self.path = path
+        self.read_only = read_only
+        if read_only:
+            return
+        conn = self._connect()
+        # WAL survives reconnects; set it once when the database is opened
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS notes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT UNIQUE NOT NULL,
+                title TEXT,
+                ciphertext TEXT,
+                metadata TEXT
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _connect(self):
+        # one short-lived connection per call, so Flask worker threads never share one
+        if self.read_only:
+            return sqlite3.connect(f"file:{quote(os.path.abspath(self.path))}?mode=ro", uri=True, timeout=30)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @staticmethod
+    def _row_to_note(row):
+        note_id, title, ciphertext, metadata = row
+        return {"id": note_id, "title": title, "ciphertext": ciphertext, "metadata": json.loads(metadata)}
+
+    @staticmethod
+    def _note_to_row(note):
+        return (note["id"], note.get("title", ""), note.get("ciphertext", ""),
+                json.dumps(note.get("metadata", {}), separators=(",", ":")))
+
+    def list_notes(self):
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT id, title, ciphertext, metadata FROM notes ORDER BY seq").fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_note(r) for r in rows]
+
+    def list_page(self, cursor=None, limit=PAGE_SIZE):
+        """Return (summaries, next_cursor) without loading ciphertext or metadata.
+           The cursor is the last seen seq, so each page is one index range scan.
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT seq, id, title, length(ciphertext) FROM notes WHERE seq > ? ORDER BY seq LIMIT ?",
+                (cursor or 0, limit + 1)).fetchall()
+        finally:
+            conn.close()
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [_summary(note_id, title, length) for _, note_id, title, length in rows[:limit]], next_cursor
+
+    def get_note(self, note_id):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT id, title, ciphertext, metadata FROM notes WHERE id = ?",
+                               (note_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._row_to_note(row) if row else None
+
+    def get_notes(self, note_ids):
+        """Return {id: note} for the ids that exist, fetched with batched IN (...) queries."""
+        note_ids = list(dict.fromkeys(note_ids))
+        found = {}
+        conn = self._connect()
+        try:
+            # stay under SQLite's default bound-parameter limit
+            for start in range(0, len(note_ids), 500):
+                batch = note_ids[start:start + 500]
+                rows = conn.execute(
+                    "SELECT id, title, ciphertext, metadata FROM notes WHERE id IN (%s)" % ",".join("?" * len(batch)),
+                    batch).fetchall()
+                for row in rows:
+                    found[row[0]] = self._row_to_note(row)
+        finally:
+            conn.close()
+        return found
+
+    def add_note(self, note):
+        self.add_notes([note])
+
+    def add_notes(self, notes):
+        """Insert several notes in one transaction; existing ids are left untouched."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO notes (id, title, ciphertext, metadata) VALUES (?, ?, ?, ?)",
+                    [self._note_to_row(n) for n in notes])
+        finally:
+            conn.close()
+
+def migrate_json_to_sqlite(json_path, db_path):
+    """Copy every note from a notes.json file into a SQLite store; returns how many were read.
+       Safe to re-run: notes whose id is already in the database are skipped.
+    """
+    notes = JsonNoteStore(json_path).list_notes()
+    SqliteNoteStore(db_path).add_notes(notes)
+    return len(notes)
+
+def open_store(backend, data_dir, read_only=False):
+    """Build the store for backend ("sqlite" or "json") under data_dir.
+       The first time the SQLite store is opened next to an existing notes.json, the notes are migrated.
+       read_only=True is for tools that only look: nothing is created or migrated, and a missing
+       store raises FileNotFoundError.
+    """
+    json_path = os.path.join(data_dir, "notes.json")
+    if backend == "json":
+        if read_only and not os.path.exists(json_path):
+            raise FileNotFoundError(f"No notes store at {json_path}")
+        return JsonNoteStore(json_path)
+    if backend == "sqlite":
+        db_path = os.path.join(data_dir, "notes.db")
+        if read_only:
+            if not os.path.exists(db_path):
+                raise FileNotFoundError(f"No notes store at {db_path}")
+            return SqliteNoteStore(db_path, read_only=True)
+        if not os.path.exists(db_path) and os.path.exists(json_path):
+            migrate_json_to_sqlite(json_path, db_path)
+        return SqliteNoteStore(db_path)
+    raise ValueError(f"Unknown notes backend: {backend}")
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 3:
+        print("usage: python storage.py <notes.json> <notes.db>")
+        sys.exit(1)
+    count = migrate_json_to_sqlite(sys.argv[1], sys.argv[2])
+    print(f"Migrated {count} notes from {sys.argv[1]} to {sys.argv[2]}")
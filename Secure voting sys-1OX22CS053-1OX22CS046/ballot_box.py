@@ -0,0 +1,389 @@
+# ballot_box.py
+# Headless bulk election jobs, as a library or from the command line:
+#   python ballot_box.py sample votes.csv 100000          # synthetic (voter_id, candidate) CSV for testing
+#   python ballot_box.py encrypt votes.csv ballots.jsonl  # one hybrid_encrypt envelope per line
+#   python ballot_box.py tally ballots.jsonl --workers 4  # parallel decrypt + count
+#   python ballot_box.py convert ballots.jsonl ballots.bin # JSONL -> binary container, no decryption
+# A ballot box is either JSON Lines (each line the {"enc_key", "nonce", "ciphertext"} dict from
+# hybrid_encrypt) or a binary container: CONTAINER_MAGIC, then for every ballot a 4-byte big-endian
+# length and a binary envelope (see election_crypto.py). tally tells them apart by the magic.
+# A container may also hold polling sessions (encrypt --session-size): a session header record
+# followed by that session's ballots, all under one RSA-wrapped data key.
+# Ballot plaintexts are either the GUI's "VoterID: ... -> Vote: ..." string or, with encrypt
+# --structured, JSON {"voter_id", "candidate"}; tally reads both.
+
+import csv, json, mmap, os, random, struct, time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from election_crypto import (KEY_DIR, SESSION_MAGIC, SESSION_BALLOT_MAGIC, ElectionCrypto, decrypt_ballot,
+                             decrypt_session_ballot, envelope_from_dict, envelope_kind, load_rsa_private,
+                             open_session, parse_vote)
+
+CONTAINER_MAGIC = b"BALLOTS1"
+_RECORD_LEN = struct.Struct(">I")
+
+CANDIDATES = ["Alice", "Bob", "Charlie", "NOTA"]
+TALLY_CHUNK_SIZE = 2000   # ballots per worker task
+
+# ---------------------------
+# Encrypting
+# ---------------------------
+def write_sample_csv(path, count, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["voter_id", "candidate"])
+        for i in range(count):
+            writer.writerow([f"V{i:07d}", rng.choice(CANDIDATES)])
+
+def read_votes_csv(path):
+    """Yield (voter_id, candidate) rows; a voter_id,candidate header line is skipped."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for i, row in enumerate(csv.reader(f)):
+            if not row:
+                continue
+            if i == 0 and [c.strip().lower() for c in row[:2]] == ["voter_id", "candidate"]:
+                continue
+            yield row[0].strip(), row[1].strip()
+
+def encrypt_csv(csv_path, ballot_box_path, key_dir=KEY_DIR, binary=False, session_size=0, structured=False):
+    """Encrypt every CSV row into a ballot box (JSONL, or a binary container if binary=True).
+       session_size > 0 writes a binary container of polling sessions of that many ballots each.
+       structured=True encrypts JSON plaintexts (format_vote_structured) instead of the GUI's string.
+       Returns {"ballots", "seconds", "ballots_per_sec"}.
+    """
+    engine = ElectionCrypto.from_key_dir(key_dir, private=False)
+    start = time.perf_counter()
+    count = 0
+    if session_size:
+        with ContainerWriter(ballot_box_path) as out:
+            for voter_id, candidate in read_votes_csv(csv_path):
+                if count % session_size == 0:
+                    session = engine.start_session()
+                    out.write(session.header)
+                out.write(session.encrypt_vote(voter_id, candidate, structured))
+                count += 1
+    elif binary:
+        with ContainerWriter(ballot_box_path) as out:
+            for voter_id, candidate in read_votes_csv(csv_path):
+                out.write(engine.encrypt_vote_binary(voter_id, candidate, structured))
+                count += 1
+    else:
+        with open(ballot_box_path, "w", encoding="utf-8") as out:
+            for voter_id, candidate in read_votes_csv(csv_path):
+                out.write(json.dumps(engine.encrypt_vote(voter_id, candidate, structured), separators=(",", ":")) + "\n")
+                count += 1
+    return _rate(count, time.perf_counter() - start)
+
+# ---------------------------
+# Binary container
+# ---------------------------
+class ContainerWriter:
+    """Append binary envelopes to a container file, writing the magic if the file is new."""
+
+    def __init__(self, path):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.f = open(path, "ab")
+        if new:
+            self.f.write(CONTAINER_MAGIC)
+        elif _read_magic(path) != CONTAINER_MAGIC:
+            self.f.close()
+            raise ValueError(f"{path} is not a ballot container")
+
+    def write(self, envelope):
+        self.f.write(_RECORD_LEN.pack(len(envelope)))
+        self.f.write(envelope)
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _read_magic(path):
+    with open(path, "rb") as f:
+        return f.read(len(CONTAINER_MAGIC))
+
+def _records(buf, start, end):
+    """Yield (offset, length) of each record between two record boundaries of a mapped container."""
+    pos = start
+    while pos < end:
+        (length,) = _RECORD_LEN.unpack_from(buf, pos)
+        pos += _RECORD_LEN.size
+        if pos + length > end:
+            raise ValueError("Ballot container is truncated")
+        yield pos, length
+        pos += length
+
+def _unmap(mm, view):
+    view.release()
+    try:
+        mm.close()
+    except BufferError:
+        pass   # the caller still holds a record view; the map is freed with the last one
+
+def iter_container(path):
+    """Yield each envelope as a memoryview into a read-only mmap of the file; nothing is copied.
+       A view is only valid until the iteration moves on; copy it with bytes() to keep it.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= len(CONTAINER_MAGIC):
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(CONTAINER_MAGIC)] != CONTAINER_MAGIC:
+        mm.close()
+        raise ValueError(f"{path} is not a ballot container")
+    view = memoryview(mm)
+    try:
+        for offset, length in _records(mm, len(CONTAINER_MAGIC), len(mm)):
+            yield view[offset:offset + length]
+    finally:
+        _unmap(mm, view)
+
+def convert_jsonl_to_container(jsonl_path, container_path, key_dir=KEY_DIR):
+    """Repack a JSONL ballot box as a binary container without decrypting anything."""
+    key_id = ElectionCrypto.from_key_dir(key_dir, private=False).key_id
+    count = 0
+    with open(jsonl_path, encoding="utf-8") as src, ContainerWriter(container_path) as out:
+        for line in src:
+            if line.strip():
+                out.write(envelope_from_dict(json.loads(line), key_id))
+                count += 1
+    return count
+
+# ---------------------------
+# Tallying
+# ---------------------------
+_worker_key = None
+_worker_sessions = {}   # session id -> AESGCM, so each worker unwraps a session key once
+
+def _init_tally_worker(key_dir):
+    # runs once per worker process: the private key is parsed once, not per ballot or per task
+    global _worker_key
+    _worker_key = load_rsa_private(key_dir)
+
+def _session_cipher(session_id, session_headers):
+    aesgcm = _worker_sessions.get(session_id)
+    if aesgcm is None:
+        if len(_worker_sessions) >= 4096:
+            _worker_sessions.clear()
+        _, aesgcm = open_session(session_headers[session_id], _worker_key)
+        _worker_sessions[session_id] = aesgcm
+    return aesgcm
+
+def _ballot_from_line(line):
+    # a ballot_server.py log line wraps the envelope as {"seq", "voter", "ballot"}
+    record = json.loads(line)
+    return record.get("ballot", record)
+
+def _count(ballots, session_headers=None):
+    """Decrypt ballots (JSONL lines as str/bytes, dicts or binary records as memoryviews);
+       returns (Counter of candidates, ballots seen, invalid count).
+       session_headers maps session id -> header record for the session ballots among them.
+       Plaintexts may be either the GUI's string or format_vote_structured JSON. Lines are parsed
+       here, under the per-ballot try, so a corrupt line counts as invalid instead of ending the tally.
+    """
+    counts = Counter()
+    seen = invalid = 0
+    for ballot in ballots:
+        try:
+            kind = None if isinstance(ballot, (dict, str, bytes)) else envelope_kind(ballot)
+            if kind == SESSION_MAGIC:
+                continue   # read by the parent; not a ballot
+            seen += 1
+            if isinstance(ballot, (str, bytes)):
+                ballot = _ballot_from_line(ballot)
+            if kind == SESSION_BALLOT_MAGIC:
+                plaintext = decrypt_session_ballot(ballot, _session_cipher(bytes(ballot[4:20]), session_headers))
+            else:
+                plaintext = decrypt_ballot(ballot, _worker_key)
+            _, candidate = parse_vote(plaintext)
+        except Exception:
+            invalid += 1
+            continue
+        counts[candidate] += 1
+    return counts, seen, invalid
+
+def _jsonl_lines(f, end):
+    # raw lines only: _count parses them, so a bad line is one invalid ballot, not a failed task
+    while f.tell() < end:
+        line = f.readline()
+        if not line:
+            break
+        if line.strip():
+            yield line
+
+def _tally_lines(path, start, end):
+    # the worker reads its own byte range, so ballots never pass through the parent
+    with open(path, "rb") as f:
+        f.seek(start)
+        return _count(_jsonl_lines(f, end))
+
+def _tally_span(path, start, end, session_headers):
+    # each worker maps the container itself, so only offsets (and session headers) cross the process boundary
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    try:
+        return _count((view[offset:offset + length] for offset, length in _records(mm, start, end)),
+                      session_headers)
+    finally:
+        _unmap(mm, view)
+
+def _jsonl_spans(path, chunk_size):
+    """Yield (start, end) byte ranges of about chunk_size lines, each ending on a line boundary.
+       The span length is estimated from the first line, so only one line per span is read here.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        span = max(len(f.readline()), 1) * chunk_size
+        start = 0
+        while start < size:
+            f.seek(min(start + span, size))
+            f.readline()
+            end = min(f.tell(), size)
+            yield start, end
+            start = end
+
+def _container_spans(path, chunk_size):
+    """Yield (start, end, session headers) for byte ranges of about chunk_size ballots.
+       Only record magics and session ids are read here; each range carries the headers of the
+       sessions its ballots belong to, so a worker never has to look outside its range.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= len(CONTAINER_MAGIC):
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        headers = {}
+        start, count, sessions = len(CONTAINER_MAGIC), 0, set()
+        for offset, length in _records(mm, start, size):
+            kind = mm[offset:offset + 2]
+            if kind == SESSION_MAGIC:
+                headers[mm[offset + 12:offset + 28]] = mm[offset:offset + length]
+                continue
+            if kind == SESSION_BALLOT_MAGIC:
+                sessions.add(mm[offset + 4:offset + 20])
+            count += 1
+            if count == chunk_size:
+                yield start, offset + length, {sid: headers[sid] for sid in sessions if sid in headers}
+                start, count, sessions = offset + length, 0, set()
+        if count:
+            yield start, size, {sid: headers[sid] for sid in sessions if sid in headers}
+    finally:
+        mm.close()
+
+def _tally_tasks(path, chunk_size):
+    """Yield (function, args) work items for either ballot-box format."""
+    if _read_magic(path) == CONTAINER_MAGIC:
+        for start, end, session_headers in _container_spans(path, chunk_size):
+            yield _tally_span, (path, start, end, session_headers)
+    else:
+        for start, end in _jsonl_spans(path, chunk_size):
+            yield _tally_lines, (path, start, end)
+
+def _run_task(fn, args):
+    # measured inside the worker: CPU seconds are what a core actually spent on these ballots
+    cpu = time.process_time()
+    counts, seen, invalid = fn(*args)
+    return counts, seen, invalid, os.getpid(), time.process_time() - cpu
+
+def tally_ballot_box(path, key_dir=KEY_DIR, workers=None, chunk_size=TALLY_CHUNK_SIZE):
+    """Decrypt and count a ballot box (JSONL or binary container) across a process pool.
+       Workers read their own byte ranges from disk and send back only per-candidate Counters,
+       which are merged as they arrive; about two tasks per worker are in flight at once, so
+       memory does not grow with the size of the ballot box.
+       Returns (Counter of candidates, stats dict); stats["per_worker"] lists each worker's
+       ballots and ballots per CPU second, and ballots_per_sec_per_core is the overall figure.
+    """
+    workers = workers or os.cpu_count() or 1
+    counts = Counter()
+    per_worker = {}   # pid -> [ballots, cpu seconds]
+    ballots = invalid = 0
+
+    def merge(future):
+        nonlocal ballots, invalid
+        chunk_counts, seen, chunk_invalid, pid, cpu = future.result()
+        counts.update(chunk_counts)
+        ballots += seen
+        invalid += chunk_invalid
+        totals = per_worker.setdefault(pid, [0, 0.0])
+        totals[0] += seen
+        totals[1] += cpu
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_tally_worker, initargs=(key_dir,)) as pool:
+        pending = set()
+        for fn, args in _tally_tasks(path, chunk_size):
+            pending.add(pool.submit(_run_task, fn, args))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    merge(future)
+        for future in pending:
+            merge(future)
+    stats = _rate(ballots, time.perf_counter() - start)
+    cpu_seconds = sum(cpu for _, cpu in per_worker.values())
+    stats.update({
+        "invalid": invalid,
+        "workers": workers,
+        "ballots_per_sec_per_core": round(ballots / cpu_seconds, 1) if cpu_seconds else None,
+        "per_worker": [{"pid": pid, "ballots": n, "ballots_per_sec": round(n / cpu, 1) if cpu else None}
+                       for pid, (n, cpu) in sorted(per_worker.items())],
+    })
+    return counts, stats
+
+def _rate(count, seconds):
+    return {"ballots": count, "seconds": round(seconds, 3),
+            "ballots_per_sec": round(count / seconds, 1) if seconds else None}
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Bulk ballot encryption and tallying without the GUI.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("sample", help="write a synthetic votes CSV")
+    p.add_argument("csv_path")
+    p.add_argument("count", type=int)
+    p = sub.add_parser("encrypt", help="encrypt a votes CSV into a JSONL ballot box")
+    p.add_argument("csv_path")
+    p.add_argument("ballot_box")
+    p.add_argument("--key-dir", default=KEY_DIR)
+    p.add_argument("--binary", action="store_true", help="write a binary container instead of JSONL")
+    p.add_argument("--session-size", type=int, default=0,
+                   help="polling-station mode: one RSA-wrapped key per this many ballots (binary container)")
+    p.add_argument("--structured", action="store_true",
+                   help="encrypt JSON {voter_id, candidate} plaintexts instead of the GUI's string")
+    p = sub.add_parser("convert", help="repack a JSONL ballot box as a binary container")
+    p.add_argument("jsonl_path")
+    p.add_argument("container_path")
+    p.add_argument("--key-dir", default=KEY_DIR)
+    p = sub.add_parser("tally", help="decrypt and count a ballot box (JSONL or binary container)")
+    p.add_argument("ballot_box")
+    p.add_argument("--key-dir", default=KEY_DIR)
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--chunk-size", type=int, default=TALLY_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if args.command == "sample":
+        write_sample_csv(args.csv_path, args.count)
+        print(f"Wrote {args.count} votes to {args.csv_path}")
+    elif args.command == "encrypt":
+        stats = encrypt_csv(args.csv_path, args.ballot_box, args.key_dir, args.binary, args.session_size,
+                            args.structured)
+        print(f"Encrypted {stats['ballots']} ballots in {stats['seconds']}s ({stats['ballots_per_sec']} ballots/s)")
+    elif args.command == "convert":
+        count = convert_jsonl_to_container(args.jsonl_path, args.container_path, args.key_dir)
+        print(f"Converted {count} ballots to {args.container_path}")
+    else:
+        counts, stats = tally_ballot_box(args.ballot_box, args.key_dir, args.workers, args.chunk_size)
+        for candidate, votes in counts.most_common():
+            print(f"{candidate:<12} {votes}")
+        print(f"Tallied {stats['ballots']} ballots ({stats['invalid']} invalid) in {stats['seconds']}s "
+              f"with {stats['workers']} workers: {stats['ballots_per_sec']} ballots/s, "
+              f"{stats['ballots_per_sec_per_core']} ballots/s per core")
+        for worker in stats["per_worker"]:
+            print(f"  worker {worker['pid']:<8} {worker['ballots']:>9} ballots  {worker['ballots_per_sec']} ballots/s")
@@ -0,0 +1,359 @@
+# ballot_server.py
+# Local ballot ingestion service that many kiosks can submit to at once, built on asyncio.
+#   python ballot_server.py serve --log ballots.log [--host 127.0.0.1] [--port 8765]
+#   python ballot_server.py loadgen --key-dir keys --kiosks 50 --ballots 20000 [--duplicates 0.01]
+#   python ballot_server.py loadgen --key-dir keys --connect 127.0.0.1:8765   # against a running server
+# Protocol: one JSON object per line over TCP.
+#   {"voter_id": "V001", "ballot": <hybrid_encrypt dict>}  ->  {"ok": true, "seq": 17} or {"ok": false, "error": ...}
+#   {"op": "metrics"}                                      ->  {"ok": true, "metrics": {...}}
+# Accepted ballots go to an append-only JSONL log that is fsync'ed in groups (group commit):
+# a ballot is only acknowledged once the fsync covering it has finished.
+
+import asyncio, hashlib, json, os, random, tempfile, time
+from collections import deque
+from election_crypto import KEY_DIR, ElectionCrypto
+
+DEFAULT_PORT = 8765
+GROUP_COMMIT_MAX = 1024       # ballots per fsync at most
+GROUP_COMMIT_WAIT = 0.001     # seconds to let a group fill up before writing it
+LATENCY_WINDOW = 10000        # commit latencies kept for the percentiles
+RATE_WINDOW = 10.0            # seconds covered by the recent ingestion rate
+
+def voter_digest(voter_id):
+    # the log and index hold a hash, not the voter id itself
+    return hashlib.sha256(voter_id.encode("utf-8")).hexdigest()
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class DuplicateVoter(Exception):
+    pass
+
+# ---------------------------
+# Append-only log
+# ---------------------------
+class BallotLog:
+    """Append-only JSONL ballot log: {"seq", "voter": voter_digest, "ballot": {...}} per line.
+       Opening it replays the file to rebuild the voter index; a torn last line (a crash
+       mid-write) is cut off, anything else unreadable is an error.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.voters = set()
+        self.seq = 0
+        self._recover()
+        self.f = open(path, "ab")
+
+    def _recover(self):
+        if not os.path.exists(self.path):
+            return
+        good = 0
+        torn = False
+        with open(self.path, "rb") as f:
+            for line in f:
+                if torn:
+                    raise ValueError(f"{self.path} is corrupt at byte {good}")
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated record")
+                    record = json.loads(line)
+                    voter, seq = record["voter"], record["seq"]
+                    if not isinstance(voter, str) or not isinstance(seq, int):
+                        raise ValueError("bad record fields")
+                except (ValueError, KeyError, TypeError):
+                    # not a {"seq", "voter", ...} object: torn if it is the last line, corrupt otherwise
+                    torn = True
+                    continue
+                self.voters.add(voter)
+                self.seq = max(self.seq, seq)
+                good += len(line)
+        if torn:
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+
+    def append(self, lines):
+        """Write and fsync a group of encoded records (blocking; run off the event loop)."""
+        self.f.write(b"".join(lines))
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def close(self):
+        self.f.close()
+
+# ---------------------------
+# Ingestion server
+# ---------------------------
+class IngestServer:
+    def __init__(self, log):
+        self.log = log
+        self.queue = None
+        self.server = None
+        self.connections = {}   # writer -> handler task
+        self.queued = set()     # futures of ballots still in the queue, not yet handed to a group commit
+        self.started = time.perf_counter()
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.commits = 0
+        self.fsync_seconds = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)   # enqueue -> fsync done, per ballot
+        self.recent = deque()                           # (commit time, ballots) within RATE_WINDOW
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.queue = asyncio.Queue()
+        self.committer = asyncio.create_task(self._group_commit())
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        self.server.close()
+        # closing the transports ends each handler's readline cleanly
+        handlers = list(self.connections.values())
+        for writer in list(self.connections):
+            writer.close()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        await self.server.wait_closed()
+        self.committer.cancel()
+        self.log.close()
+
+    async def submit(self, voter_id, ballot):
+        """Queue a ballot for the next group commit; returns its sequence number once it is durable."""
+        digest = voter_digest(voter_id)
+        if digest in self.log.voters:
+            self.duplicates += 1
+            raise DuplicateVoter(voter_id)
+        # reserve the voter before waiting, so a concurrent duplicate is rejected too
+        self.log.voters.add(digest)
+        self.log.seq += 1
+        seq = self.log.seq
+        line = json.dumps({"seq": seq, "voter": digest, "ballot": ballot}, separators=(",", ":")).encode() + b"\n"
+        done = asyncio.get_running_loop().create_future()
+        self.queued.add(done)
+        self.queue.put_nowait((line, done, time.perf_counter()))
+        try:
+            # shielded: cancelling this request must not cancel a ballot that is already being written
+            await asyncio.shield(done)
+        except BaseException:
+            if done in self.queued:
+                # never handed to _group_commit, so never written: drop it and free the voter
+                self.queued.discard(done)
+                done.cancel()
+                self.log.voters.discard(digest)
+            else:
+                # it may be on disk (or half-written); keep the reservation, recovery is the judge
+                done.add_done_callback(lambda f: f.cancelled() or f.exception())
+            raise
+        return seq
+
+    async def _group_commit(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            group = [await self.queue.get()]
+            await asyncio.sleep(GROUP_COMMIT_WAIT)
+            while not self.queue.empty() and len(group) < GROUP_COMMIT_MAX:
+                group.append(self.queue.get_nowait())
+            # hand-off: from here a ballot may reach the disk; ones withdrawn while queued are skipped
+            group = [entry for entry in group if not entry[1].cancelled()]
+            for _, done, _ in group:
+                self.queued.discard(done)
+            if not group:
+                continue
+
+            start = time.perf_counter()
+            try:
+                await loop.run_in_executor(None, self.log.append, [line for line, _, _ in group])
+            except Exception as e:
+                for _, done, _ in group:
+                    if not done.done():
+                        done.set_exception(e)
+                continue
+            now = time.perf_counter()
+            self.fsync_seconds += now - start
+            self.commits += 1
+            self.accepted += len(group)
+            self.recent.append((now, len(group)))
+            for _, done, enqueued in group:
+                self.latencies.append(now - enqueued)
+                if not done.done():
+                    done.set_result(None)
+
+    def metrics(self):
+        now = time.perf_counter()
+        while self.recent and self.recent[0][0] < now - RATE_WINDOW:
+            self.recent.popleft()
+        window = min(RATE_WINDOW, now - self.started)
+        ordered = sorted(self.latencies)
+        ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+        return {
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "uptime_s": round(now - self.started, 3),
+            "ingest_rate": round(self.accepted / (now - self.started), 1),
+            "recent_rate": round(sum(n for _, n in self.recent) / window, 1) if window else None,
+            "commits": self.commits,
+            "mean_group": round(self.accepted / self.commits, 1) if self.commits else None,
+            "mean_fsync_ms": ms(self.fsync_seconds / self.commits) if self.commits else None,
+            "commit_latency_ms": {
+                "p50": ms(_percentile(ordered, 0.50)),
+                "p95": ms(_percentile(ordered, 0.95)),
+                "p99": ms(_percentile(ordered, 0.99)),
+                "max": ms(ordered[-1] if ordered else None),
+            },
+        }
+
+    async def _dispatch(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            self.rejected += 1
+            return {"ok": False, "error": "Request is not valid JSON"}
+        if not isinstance(request, dict):
+            self.rejected += 1
+            return {"ok": False, "error": "Request must be a JSON object"}
+        if request.get("op") == "metrics":
+            return {"ok": True, "metrics": self.metrics()}
+
+        voter_id = request.get("voter_id")
+        ballot = request.get("ballot")
+        if not isinstance(voter_id, str) or not voter_id.strip():
+            self.rejected += 1
+            return {"ok": False, "error": "Missing voter_id"}
+        if not isinstance(ballot, dict) or not all(isinstance(ballot.get(k), str)
+                                                   for k in ("enc_key", "nonce", "ciphertext")):
+            self.rejected += 1
+            return {"ok": False, "error": "ballot must be a hybrid_encrypt dict"}
+        try:
+            seq = await self.submit(voter_id.strip(), ballot)
+        except DuplicateVoter:
+            return {"ok": False, "error": "This voter has already voted"}
+        except Exception as e:
+            return {"ok": False, "error": f"Could not store ballot: {e}"}
+        return {"ok": True, "seq": seq}
+
+    async def _handle(self, reader, writer):
+        self.connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = await self._dispatch(line)
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self.connections.pop(writer, None)
+            writer.close()
+
+async def serve(log_path, host="127.0.0.1", port=DEFAULT_PORT, report_every=5.0):
+    server = IngestServer(BallotLog(log_path))
+    address = await server.start(host, port)
+    print(f"Ingesting ballots on {address[0]}:{address[1]} into {log_path} "
+          f"({len(server.log.voters)} voters already recorded)")
+    try:
+        while True:
+            await asyncio.sleep(report_every)
+            print(json.dumps(server.metrics()))
+    finally:
+        await server.stop()
+
+# ---------------------------
+# Load generator
+# ---------------------------
+async def _kiosk(host, port, items, latencies, outcomes):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for voter_id, ballot in items:
+            start = time.perf_counter()
+            writer.write(json.dumps({"voter_id": voter_id, "ballot": ballot}).encode() + b"\n")
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - start)
+            outcomes["accepted" if reply["ok"] else "refused"] += 1
+    finally:
+        writer.close()
+
+async def _fetch_metrics(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b'{"op": "metrics"}\n')
+    await writer.drain()
+    reply = json.loads(await reader.readline())
+    writer.close()
+    return reply["metrics"]
+
+async def load_generator(key_dir=KEY_DIR, kiosks=50, ballots=20000, duplicates=0.0, connect=None, log_path=None):
+    """Submit pre-encrypted ballots from many concurrent kiosk connections; returns a report dict.
+       Without connect (a (host, port) pair) an in-process server with its own log is started.
+    """
+    engine = ElectionCrypto.from_key_dir(key_dir, private=False)
+    rng = random.Random(0)
+    run = os.urandom(4).hex()   # fresh voter ids for every run against the same log
+    work = [(f"{run}-V{i:07d}", engine.encrypt_vote(f"{run}-V{i:07d}", rng.choice(["Alice", "Bob", "Charlie", "NOTA"])))
+            for i in range(ballots)]
+    work += [(voter_id, ballot) for voter_id, ballot in rng.sample(work, int(ballots * duplicates))]
+    rng.shuffle(work)
+
+    server = None
+    if connect is None:
+        log_path = log_path or os.path.join(tempfile.mkdtemp(prefix="ballots-"), "ballots.log")
+        server = IngestServer(BallotLog(log_path))
+        connect = await server.start("127.0.0.1", 0)
+    host, port = connect
+
+    latencies = []
+    outcomes = {"accepted": 0, "refused": 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(_kiosk(host, port, work[k::kiosks], latencies, outcomes) for k in range(kiosks)))
+    elapsed = time.perf_counter() - start
+    metrics = await _fetch_metrics(host, port)
+    if server is not None:
+        await server.stop()
+
+    latencies.sort()
+    return {
+        "kiosks": kiosks,
+        "submitted": len(work),
+        "accepted": outcomes["accepted"],
+        "refused": outcomes["refused"],
+        "seconds": round(elapsed, 3),
+        "ballots_per_sec": round(len(work) / elapsed, 1),
+        "round_trip_ms": {"p50": round(_percentile(latencies, 0.50) * 1000, 3),
+                          "p99": round(_percentile(latencies, 0.99) * 1000, 3)},
+        "log": log_path,
+        "server": metrics,
+    }
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Asyncio ballot ingestion service with an append-only log.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("serve", help="accept ballots from kiosks")
+    p.add_argument("--log", default="ballots.log")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p = sub.add_parser("loadgen", help="simulate many kiosks submitting ballots")
+    p.add_argument("--key-dir", default=KEY_DIR)
+    p.add_argument("--kiosks", type=int, default=50)
+    p.add_argument("--ballots", type=int, default=20000)
+    p.add_argument("--duplicates", type=float, default=0.0, help="fraction of extra ballots reusing a voter id")
+    p.add_argument("--connect", help="HOST:PORT of a running server (default: start one in-process)")
+    p.add_argument("--log", help="log file for the in-process server (default: a temp file)")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.log, args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        connect = None
+        if args.connect:
+            host, _, port = args.connect.rpartition(":")
+            connect = (host, int(port))
+        report = asyncio.run(load_generator(args.key_dir, args.kiosks, args.ballots, args.duplicates, connect, args.log))
+        print(json.dumps(report, indent=2))
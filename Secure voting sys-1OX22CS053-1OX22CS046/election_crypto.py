@@ -0,0 +1,285 @@
+# election_crypto.py
+# Key management and hybrid (RSA-OAEP + AES-GCM) ballot encryption for the secret voting system.
+# Nothing in here touches Tk, so elections can be scripted without the GUI (secret_voting.py imports it).
+
+import os
+import base64
+import hashlib
+import json
+import re
+import struct
+import threading
+from collections import namedtuple
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives import serialization, hashes
+from cryptography.hazmat.primitives.asymmetric import rsa, padding
+
+# ======================== KEY MANAGEMENT ========================
+KEY_DIR = "server/keys"
+PRIV_KEY_FILE = os.path.join(KEY_DIR, "election_priv.pem")
+PUB_KEY_FILE = os.path.join(KEY_DIR, "election_pub.pem")
+
+def generate_keys(key_dir=KEY_DIR):
+    priv_file = os.path.join(key_dir, "election_priv.pem")
+    pub_file = os.path.join(key_dir, "election_pub.pem")
+    if not os.path.exists(key_dir):
+        os.makedirs(key_dir)
+    if not os.path.exists(priv_file) or not os.path.exists(pub_file):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        with open(priv_file, "wb") as f:
+            f.write(private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.TraditionalOpenSSL,
+                encryption_algorithm=serialization.NoEncryption()
+            ))
+        with open(pub_file, "wb") as f:
+            f.write(private_key.public_key().public_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo
+            ))
+
+def load_rsa_public(key_dir=KEY_DIR):
+    with open(os.path.join(key_dir, "election_pub.pem"), "rb") as f:
+        return serialization.load_pem_public_key(f.read())
+
+def load_rsa_private(key_dir=KEY_DIR):
+    with open(os.path.join(key_dir, "election_priv.pem"), "rb") as f:
+        return serialization.load_pem_private_key(f.read(), password=None)
+
+# ==================== ENCRYPTION / DECRYPTION ====================
+# Padding objects hold no per-call state, so one instance serves every ballot.
+OAEP_PADDING = padding.OAEP(
+    mgf=padding.MGF1(algorithm=hashes.SHA256()),
+    algorithm=hashes.SHA256(),
+    label=None
+)
+
+def format_vote(voter_id, candidate):
+    return f"VoterID: {voter_id} -> Vote: {candidate}"
+
+def format_vote_structured(voter_id, candidate):
+    """JSON plaintext for headless ballots; unlike format_vote it survives any character in the fields."""
+    return json.dumps({"voter_id": voter_id, "candidate": candidate}, separators=(",", ":"))
+
+_VOTE_RE = re.compile(r"VoterID: (.*) -> Vote: (.*)\Z", re.S)
+
+def parse_vote(plaintext):
+    """Return (voter_id, candidate) from a decrypted ballot (str or bytes) in either plaintext format."""
+    if isinstance(plaintext, (bytes, bytearray, memoryview)):
+        plaintext = bytes(plaintext).decode()
+    if plaintext.startswith("{"):
+        vote = json.loads(plaintext)
+        return vote["voter_id"], vote["candidate"]
+    match = _VOTE_RE.match(plaintext)
+    if match is None:
+        raise ValueError(f"Unrecognised ballot plaintext: {plaintext[:40]!r}")
+    return match.group(1), match.group(2)
+
+def _vote_bytes(voter_id, candidate, structured):
+    return (format_vote_structured if structured else format_vote)(voter_id, candidate).encode()
+
+def hybrid_encrypt(plaintext_bytes, rsa_public):
+    key = AESGCM.generate_key(bit_length=256)
+    aesgcm = AESGCM(key)
+    nonce = os.urandom(12)
+    ciphertext = aesgcm.encrypt(nonce, plaintext_bytes, None)
+
+    enc_key = rsa_public.encrypt(key, OAEP_PADDING)
+
+    return {
+        "enc_key": base64.b64encode(enc_key).decode(),
+        "nonce": base64.b64encode(nonce).decode(),
+        "ciphertext": base64.b64encode(ciphertext).decode()
+    }
+
+def decrypt_ballot(ballot, rsa_private):
+    """Decrypt a ballot to bytes; raises on a bad key or tampered ballot.
+       ballot is either a hybrid_encrypt dict or a binary envelope (bytes, bytearray or memoryview).
+    """
+    if isinstance(ballot, dict):
+        enc_key = base64.b64decode(ballot["enc_key"])
+        nonce = base64.b64decode(ballot["nonce"])
+        ciphertext = base64.b64decode(ballot["ciphertext"])
+    else:
+        envelope = parse_envelope(ballot)
+        # RSA decrypt only takes bytes; AESGCM reads the nonce and ciphertext views in place
+        enc_key, nonce, ciphertext = bytes(envelope.enc_key), envelope.nonce, envelope.ciphertext
+
+    aes_key = rsa_private.decrypt(enc_key, OAEP_PADDING)
+    return AESGCM(aes_key).decrypt(nonce, ciphertext, None)
+
+def hybrid_decrypt(encrypted_dict, rsa_private):
+    try:
+        return decrypt_ballot(encrypted_dict, rsa_private).decode()
+    except Exception as e:
+        return f"❌ Decryption Error: {str(e)}"
+
+# ===================== BINARY ENVELOPE =====================
+# A compact alternative to the base64 dict, for large ballot boxes:
+#   magic "BV" | version (1 byte) | reserved (1 byte) | key id (8 bytes) | wrapped key length (2 bytes, big-endian)
+#   | RSA-wrapped AES key | 12-byte nonce | AES-GCM ciphertext + tag
+# The key id is the first 8 bytes of SHA-256 over the election public key (DER), so a tally can
+# tell a ballot meant for another election key from a corrupted one.
+ENVELOPE_MAGIC = b"BV"
+ENVELOPE_VERSION = 1
+_ENVELOPE_HEADER = struct.Struct(">2sBB8sH")
+NONCE_SIZE = 12
+
+BallotEnvelope = namedtuple("BallotEnvelope", "version key_id enc_key nonce ciphertext")
+
+def public_key_id(rsa_public):
+    der = rsa_public.public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return hashlib.sha256(der).digest()[:8]
+
+def pack_envelope(key_id, enc_key, nonce, ciphertext):
+    return _ENVELOPE_HEADER.pack(ENVELOPE_MAGIC, ENVELOPE_VERSION, 0, key_id, len(enc_key)) + enc_key + nonce + ciphertext
+
+def parse_envelope(data):
+    """Split a binary envelope into a BallotEnvelope of memoryviews over data (no copies)."""
+    view = memoryview(data)
+    if len(view) < _ENVELOPE_HEADER.size:
+        raise ValueError("Ballot envelope is truncated")
+    magic, version, _, key_id, key_len = _ENVELOPE_HEADER.unpack_from(view)
+    if magic != ENVELOPE_MAGIC:
+        raise ValueError("Not a binary ballot envelope")
+    if version != ENVELOPE_VERSION:
+        raise ValueError(f"Unsupported ballot envelope version {version}")
+    nonce_at = _ENVELOPE_HEADER.size + key_len
+    if len(view) < nonce_at + NONCE_SIZE + 16:
+        raise ValueError("Ballot envelope is truncated")
+    return BallotEnvelope(version, key_id, view[_ENVELOPE_HEADER.size:nonce_at],
+                          view[nonce_at:nonce_at + NONCE_SIZE], view[nonce_at + NONCE_SIZE:])
+
+def hybrid_encrypt_binary(plaintext_bytes, rsa_public, key_id=None):
+    """hybrid_encrypt, packed as a binary envelope instead of a base64 dict."""
+    key = AESGCM.generate_key(bit_length=256)
+    nonce = os.urandom(NONCE_SIZE)
+    ciphertext = AESGCM(key).encrypt(nonce, plaintext_bytes, None)
+    enc_key = rsa_public.encrypt(key, OAEP_PADDING)
+    return pack_envelope(key_id or public_key_id(rsa_public), enc_key, nonce, ciphertext)
+
+def envelope_from_dict(encrypted_dict, key_id):
+    """Repack a hybrid_encrypt dict as a binary envelope (no decryption needed)."""
+    return pack_envelope(key_id, base64.b64decode(encrypted_dict["enc_key"]),
+                         base64.b64decode(encrypted_dict["nonce"]), base64.b64decode(encrypted_dict["ciphertext"]))
+
+# ===================== POLLING SESSIONS =====================
+# Session mode amortises the RSA cost: a polling station wraps one random data key per session
+# with the election public key, then encrypts each ballot with AES-GCM under that key and a
+# counter nonce (0, 1, 2, ... - unique because the key is never reused across sessions).
+# The tally does one RSA decrypt per session instead of one per ballot.
+#   session header: "BS" | version | reserved | key id (8) | session id (16) | wrapped key length (2) | wrapped key
+#   session ballot: "BB" | version | reserved | session id (16) | nonce (12) | AES-GCM ciphertext + tag
+# The session id is also the associated data of every ballot in the session.
+SESSION_MAGIC = b"BS"
+SESSION_BALLOT_MAGIC = b"BB"
+_SESSION_HEADER = struct.Struct(">2sBB8s16sH")
+_SESSION_BALLOT_HEADER = struct.Struct(">2sBB16s")
+MAX_SESSION_BALLOTS = 2 ** 32
+
+SessionHeader = namedtuple("SessionHeader", "key_id session_id enc_key")
+SessionBallot = namedtuple("SessionBallot", "session_id nonce ciphertext")
+
+class PollingSession:
+    """One polling station session: a single RSA-wrapped data key and counter nonces.
+       header is written once, before the session's ballots; encrypt is safe to call from several threads.
+    """
+
+    def __init__(self, rsa_public, key_id=None):
+        self.session_id = os.urandom(16)
+        data_key = AESGCM.generate_key(bit_length=256)
+        self._aesgcm = AESGCM(data_key)
+        self._lock = threading.Lock()
+        self.count = 0
+        enc_key = rsa_public.encrypt(data_key, OAEP_PADDING)
+        self.header = _SESSION_HEADER.pack(SESSION_MAGIC, ENVELOPE_VERSION, 0, key_id or public_key_id(rsa_public),
+                                           self.session_id, len(enc_key)) + enc_key
+
+    def encrypt(self, plaintext_bytes):
+        with self._lock:
+            if self.count >= MAX_SESSION_BALLOTS:
+                raise ValueError("Polling session is full; start a new one")
+            nonce = self.count.to_bytes(NONCE_SIZE, "big")
+            self.count += 1
+        ciphertext = self._aesgcm.encrypt(nonce, plaintext_bytes, self.session_id)
+        return _SESSION_BALLOT_HEADER.pack(SESSION_BALLOT_MAGIC, ENVELOPE_VERSION, 0, self.session_id) + nonce + ciphertext
+
+    def encrypt_vote(self, voter_id, candidate, structured=False):
+        return self.encrypt(_vote_bytes(voter_id, candidate, structured))
+
+def envelope_kind(data):
+    """The 2-byte magic of a binary record: ENVELOPE_MAGIC, SESSION_MAGIC or SESSION_BALLOT_MAGIC."""
+    return bytes(data[:2])
+
+def parse_session_header(data):
+    view = memoryview(data)
+    if len(view) < _SESSION_HEADER.size:
+        raise ValueError("Session header is truncated")
+    magic, version, _, key_id, session_id, key_len = _SESSION_HEADER.unpack_from(view)
+    if magic != SESSION_MAGIC or version != ENVELOPE_VERSION:
+        raise ValueError("Not a version 1 session header")
+    return SessionHeader(key_id, session_id, view[_SESSION_HEADER.size:_SESSION_HEADER.size + key_len])
+
+def parse_session_ballot(data):
+    """Split a session ballot into a SessionBallot of memoryviews over data (no copies)."""
+    view = memoryview(data)
+    if len(view) < _SESSION_BALLOT_HEADER.size + NONCE_SIZE + 16:
+        raise ValueError("Session ballot is truncated")
+    magic, version, _, session_id = _SESSION_BALLOT_HEADER.unpack_from(view)
+    if magic != SESSION_BALLOT_MAGIC or version != ENVELOPE_VERSION:
+        raise ValueError("Not a version 1 session ballot")
+    nonce_at = _SESSION_BALLOT_HEADER.size
+    return SessionBallot(session_id, view[nonce_at:nonce_at + NONCE_SIZE], view[nonce_at + NONCE_SIZE:])
+
+def open_session(header, rsa_private):
+    """Unwrap a session's data key (the one RSA operation per session); returns (session id, AESGCM)."""
+    parsed = parse_session_header(header)
+    return parsed.session_id, AESGCM(rsa_private.decrypt(bytes(parsed.enc_key), OAEP_PADDING))
+
+def decrypt_session_ballot(ballot, aesgcm):
+    parsed = parse_session_ballot(ballot)
+    return aesgcm.decrypt(parsed.nonce, parsed.ciphertext, parsed.session_id)
+
+# ========================== ENGINE ==========================
+class ElectionCrypto:
+    """Holds the election keys, loaded once, and encrypts/decrypts ballots with them.
+       Either key may be None: polling stations only need the public key, the tally only the private one.
+    """
+
+    def __init__(self, rsa_public=None, rsa_private=None):
+        if rsa_public is None and rsa_private is not None:
+            rsa_public = rsa_private.public_key()
+        self.rsa_public = rsa_public
+        self.rsa_private = rsa_private
+        self.key_id = public_key_id(rsa_public) if rsa_public is not None else None
+
+    @classmethod
+    def from_key_dir(cls, key_dir=KEY_DIR, private=True):
+        """Load the keys from key_dir; private=False skips the private key."""
+        return cls(load_rsa_public(key_dir), load_rsa_private(key_dir) if private else None)
+
+    def encrypt(self, plaintext_bytes):
+        return hybrid_encrypt(plaintext_bytes, self.rsa_public)
+
+    def encrypt_vote(self, voter_id, candidate, structured=False):
+        return self.encrypt(_vote_bytes(voter_id, candidate, structured))
+
+    def encrypt_binary(self, plaintext_bytes):
+        return hybrid_encrypt_binary(plaintext_bytes, self.rsa_public, self.key_id)
+
+    def encrypt_vote_binary(self, voter_id, candidate, structured=False):
+        return self.encrypt_binary(_vote_bytes(voter_id, candidate, structured))
+
+    def start_session(self):
+        return PollingSession(self.rsa_public, self.key_id)
+
+    def decrypt(self, ballot):
+        """Return the plaintext string of a dict or binary ballot; raises instead of returning an error message."""
+        if self.rsa_private is None:
+            raise ValueError("This ElectionCrypto has no private key")
+        if not isinstance(ballot, dict) and parse_envelope(ballot).key_id != self.key_id:
+            raise ValueError("Ballot was encrypted for a different election key")
+        return decrypt_ballot(ballot, self.rsa_private).decode()
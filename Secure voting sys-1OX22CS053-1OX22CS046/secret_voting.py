@@ -1,83 +1,39 @@
-import os
-import base64
+import time
 import tkinter as tk
 from tkinter import messagebox
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from cryptography.hazmat.primitives import serialization, hashes
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
-
-# ======================== KEY MANAGEMENT ========================
-KEY_DIR = "server/keys"
-PRIV_KEY_FILE = os.path.join(KEY_DIR, "election_priv.pem")
-PUB_KEY_FILE = os.path.join(KEY_DIR, "election_pub.pem")
-
-def generate_keys():
-    if not os.path.exists(KEY_DIR):
-        os.makedirs(KEY_DIR)
-    if not os.path.exists(PRIV_KEY_FILE) or not os.path.exists(PUB_KEY_FILE):
-        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
-        with open(PRIV_KEY_FILE, "wb") as f:
-            f.write(private_key.private_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PrivateFormat.TraditionalOpenSSL,
-                encryption_algorithm=serialization.NoEncryption()
-            ))
-        with open(PUB_KEY_FILE, "wb") as f:
-            f.write(private_key.public_key().public_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PublicFormat.SubjectPublicKeyInfo
-            ))
-
-def load_rsa_public():
-    with open(PUB_KEY_FILE, "rb") as f:
-        return serialization.load_pem_public_key(f.read())
-
-def load_rsa_private():
-    with open(PRIV_KEY_FILE, "rb") as f:
-        return serialization.load_pem_private_key(f.read(), password=None)
-
-# ==================== ENCRYPTION / DECRYPTION ====================
-def hybrid_encrypt(plaintext_bytes, rsa_public):
-    key = AESGCM.generate_key(bit_length=256)
-    aesgcm = AESGCM(key)
-    nonce = os.urandom(12)
-    ciphertext = aesgcm.encrypt(nonce, plaintext_bytes, None)
-
-    enc_key = rsa_public.encrypt(
-        key,
-        padding.OAEP(
-            mgf=padding.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None
-        )
-    )
-
-    return {
-        "enc_key": base64.b64encode(enc_key).decode(),
-        "nonce": base64.b64encode(nonce).decode(),
-        "ciphertext": base64.b64encode(ciphertext).decode()
-    }
-
-def hybrid_decrypt(encrypted_dict, rsa_private):
-    try:
-        enc_key = base64.b64decode(encrypted_dict["enc_key"])
-        nonce = base64.b64decode(encrypted_dict["nonce"])
-        ciphertext = base64.b64decode(encrypted_dict["ciphertext"])
-
-        aes_key = rsa_private.decrypt(
-            enc_key,
-            padding.OAEP(
-                mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                algorithm=hashes.SHA256(),
-                label=None
-            )
-        )
-
-        aesgcm = AESGCM(aes_key)
-        plaintext = aesgcm.decrypt(nonce, ciphertext, None)
-        return plaintext.decode()
-    except Exception as e:
-        return f"❌ Decryption Error: {str(e)}"
+from concurrent.futures import ThreadPoolExecutor
+from election_crypto import (
+    KEY_DIR, PRIV_KEY_FILE, PUB_KEY_FILE, ElectionCrypto, format_vote,
+    generate_keys, load_rsa_public, load_rsa_private, hybrid_encrypt, hybrid_decrypt
+)
+
+# ====================== BACKGROUND WORKER ======================
+# Crypto and key generation run on one worker thread so the Tk main loop never blocks.
+# Tk is not thread-safe, so results come back by polling the future with after() on the main thread.
+POLL_MS = 15
+
+def run_in_background(widget, executor, fn, on_done, on_error=None):
+    future = executor.submit(fn)
+
+    def check():
+        if not future.done():
+            widget.after(POLL_MS, check)
+            return
+        error = future.exception()
+        if error is None:
+            on_done(future.result())
+        elif on_error is not None:
+            on_error(error)
+        else:
+            messagebox.showerror("Error", str(error))
+
+    widget.after(POLL_MS, check)
+    return future
+
+def prepare_election(key_dir=KEY_DIR):
+    """Create the election keys if needed and load them (the slow start-up step)."""
+    generate_keys(key_dir)
+    return ElectionCrypto.from_key_dir(key_dir)
 
 # ========================== VOTING PAGE ==========================
 class VotingPage(tk.Frame):
@@ -102,8 +58,9 @@ class VotingPage(tk.Frame):
             tk.Radiobutton(self, text=candidate, variable=self.choice_var, value=candidate,
                            font=("Arial", 11), bg="#e6f2ff", padx=10).pack(anchor="w", padx=80)
 
-        tk.Button(self, text="Submit Vote", command=self.submit_vote,
-                  bg="#28a745", fg="white", font=("Arial", 12), padx=8, pady=3).pack(pady=8)
+        self.submit_button = tk.Button(self, text="Submit Vote", command=self.submit_vote,
+                                       bg="#28a745", fg="white", font=("Arial", 12), padx=8, pady=3)
+        self.submit_button.pack(pady=8)
 
         tk.Label(self, text="Encrypted Vote Output:", font=("Arial", 12, "bold"), bg="#e6f2ff").pack()
         self.encrypted_output = tk.Text(self, height=6, width=80, font=("Courier", 9), state="disabled", bg="#fff8dc")
@@ -112,6 +69,11 @@ class VotingPage(tk.Frame):
         tk.Button(self, text="Go to Decrypt Page", command=self.go_to_decrypt,
                   bg="#6f42c1", fg="white", font=("Arial", 11), padx=8, pady=3).pack(pady=10)
 
+        # Timing overlay: encrypt time on the worker, and submit-to-display time
+        self.timings = []
+        self.timing_label = tk.Label(self, text="", font=("Courier", 9), bg="#e6f2ff", fg="#555555")
+        self.timing_label.place(relx=1.0, rely=1.0, anchor="se", x=-6, y=-4)
+
     def submit_vote(self):
         voter_id = self.voter_id_entry.get().strip()
         candidate = self.choice_var.get()
@@ -123,8 +85,29 @@ class VotingPage(tk.Frame):
             messagebox.showwarning("Input Error", "Please select a candidate.")
             return
 
-        vote_data = f"VoterID: {voter_id} -> Vote: {candidate}"
-        encrypted = hybrid_encrypt(vote_data.encode(), self.rsa_public)
+        vote_data = format_vote(voter_id, candidate)
+        rsa_public = self.rsa_public
+        submitted = time.perf_counter()
+
+        def encrypt():
+            start = time.perf_counter()
+            encrypted = hybrid_encrypt(vote_data.encode(), rsa_public)
+            return encrypted, time.perf_counter() - start
+
+        def done(outcome):
+            encrypted, encrypt_seconds = outcome
+            self.submit_button.config(state="normal")
+            self.show_encrypted(encrypted)
+            self.record_timing(encrypt_seconds, time.perf_counter() - submitted)
+
+        def failed(error):
+            self.submit_button.config(state="normal")
+            messagebox.showerror("Encryption Error", str(error))
+
+        self.submit_button.config(state="disabled")  # one vote in flight at a time
+        run_in_background(self, self.controller.executor, encrypt, done, failed)
+
+    def show_encrypted(self, encrypted):
         self.encrypted = encrypted  # Save encrypted vote
 
         self.encrypted_output.config(state="normal")
@@ -134,6 +117,13 @@ class VotingPage(tk.Frame):
         self.encrypted_output.insert(tk.END, f"ciphertext: {encrypted['ciphertext']}\n")
         self.encrypted_output.config(state="disabled")
 
+    def record_timing(self, encrypt_seconds, total_seconds):
+        self.timings.append(encrypt_seconds)
+        average = sum(self.timings) / len(self.timings)
+        self.timing_label.config(
+            text=f"encrypt {encrypt_seconds * 1000:.1f} ms | on screen {total_seconds * 1000:.1f} ms | "
+                 f"avg {average * 1000:.1f} ms over {len(self.timings)} votes")
+
     def go_to_decrypt(self):
         if self.encrypted is None:
             if not messagebox.askyesno("No Vote Submitted", "No encrypted vote found. Continue to decrypt page?"):
@@ -153,8 +143,9 @@ class DecryptPage(tk.Frame):
         self.nonce_entry = self.create_labeled_entry("Nonce (base64):")
         self.ciphertext_entry = self.create_labeled_entry("Ciphertext (base64):")
 
-        tk.Button(self, text="Decrypt", command=self.decrypt_input,
-                  bg="#007bff", fg="white", font=("Arial", 12), padx=8, pady=3).pack(pady=6)
+        self.decrypt_button = tk.Button(self, text="Decrypt", command=self.decrypt_input,
+                                        bg="#007bff", fg="white", font=("Arial", 12), padx=8, pady=3)
+        self.decrypt_button.pack(pady=6)
 
         tk.Label(self, text="Decrypted Plaintext:", font=("Arial", 12, "bold"), bg="#e6f2ff").pack(pady=4)
 
@@ -193,29 +184,80 @@ class DecryptPage(tk.Frame):
             "ciphertext": ciphertext
         }
 
-        decrypted = hybrid_decrypt(encrypted_data, self.rsa_private)
+        rsa_private = self.rsa_private
+        self.decrypt_button.config(state="disabled")
+
+        def done(decrypted):
+            self.decrypt_button.config(state="normal")
+            self.show_decrypted(decrypted)
+
+        def failed(error):
+            self.decrypt_button.config(state="normal")
+            messagebox.showerror("Decryption Error", str(error))
+
+        run_in_background(self, self.controller.executor,
+                          lambda: hybrid_decrypt(encrypted_data, rsa_private), done, failed)
 
+    def show_decrypted(self, decrypted):
         self.decrypted_output.config(state="normal")
         self.decrypted_output.delete(1.0, tk.END)
         self.decrypted_output.insert(tk.END, "✅ Decrypted Plaintext Vote:\n\n")
         self.decrypted_output.insert(tk.END, decrypted)
         self.decrypted_output.config(state="disabled")
 
+# ========================== SPLASH SCREEN ==========================
+class SplashPage(tk.Frame):
+    def __init__(self, parent):
+        super().__init__(parent, bg="#003366")
+        tk.Label(self, text="🗳️ Secret Voting System", font=("Helvetica", 20, "bold"),
+                 bg="#003366", fg="white").pack(expand=True, pady=(120, 10))
+        self.status = tk.Label(self, text="Preparing election keys...", font=("Arial", 12),
+                               bg="#003366", fg="#cce0ff")
+        self.status.pack(expand=True, pady=(0, 120))
+
 # ========================== CONTROLLER APP ===========================
 class VotingApp(tk.Tk):
-    def __init__(self, rsa_public, rsa_private):
+    """Pass both keys to start straight away; with no keys, a splash screen shows while
+       prepare_election (RSA key generation and loading) runs on the worker thread.
+    """
+
+    def __init__(self, rsa_public=None, rsa_private=None, key_dir=KEY_DIR):
         super().__init__()
         self.title("🗳️ Secret Voting System - Hybrid Encryption")
         self.geometry("720x620")
         self.configure(bg="#e6f2ff")
 
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crypto")
+        self.protocol("WM_DELETE_WINDOW", self.close)
         self.frames = {}
 
-        container = tk.Frame(self, bg="#e6f2ff")
-        container.pack(fill="both", expand=True)
+        self.container = tk.Frame(self, bg="#e6f2ff")
+        self.container.pack(fill="both", expand=True)
+        self.container.grid_rowconfigure(0, weight=1)
+        self.container.grid_columnconfigure(0, weight=1)
+
+        if rsa_public is not None and rsa_private is not None:
+            self.build_pages(rsa_public, rsa_private)
+            return
+
+        self.splash = SplashPage(self.container)
+        self.splash.grid(row=0, column=0, sticky="nsew")
+        started = time.perf_counter()
 
-        self.frames["VotingPage"] = VotingPage(container, self, rsa_public)
-        self.frames["DecryptPage"] = DecryptPage(container, self, rsa_private)
+        def ready(engine):
+            self.splash.destroy()
+            self.build_pages(engine.rsa_public, engine.rsa_private)
+            self.frames["VotingPage"].timing_label.config(
+                text=f"keys ready in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        def failed(error):
+            self.splash.status.config(text=f"Could not prepare keys: {error}")
+
+        run_in_background(self, self.executor, lambda: prepare_election(key_dir), ready, failed)
+
+    def build_pages(self, rsa_public, rsa_private):
+        self.frames["VotingPage"] = VotingPage(self.container, self, rsa_public)
+        self.frames["DecryptPage"] = DecryptPage(self.container, self, rsa_private)
 
         for frame in self.frames.values():
             frame.grid(row=0, column=0, sticky="nsew")
@@ -227,10 +269,11 @@ class VotingApp(tk.Tk):
         frame.tkraise()
         # Removed clear_inputs on decrypt page to keep data persistent
 
-if __name__ == "__main__":
-    generate_keys()
-    rsa_pub = load_rsa_public()
-    rsa_priv = load_rsa_private()
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
 
-    app = VotingApp(rsa_pub, rsa_priv)
+if __name__ == "__main__":
+    # the window (with its splash screen) appears at once; keys are generated/loaded in the background
+    app = VotingApp()
     app.mainloop()
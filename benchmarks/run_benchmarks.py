@@ -0,0 +1,338 @@
+# run_benchmarks.py
+# Performance benchmarks for the crypto paths of the projects in this repository.
+#
+#   python benchmarks/run_benchmarks.py run [--quick] [--filter notes] [--output results.json]
+#   python benchmarks/run_benchmarks.py run --save-baseline            # writes benchmarks/baseline.json
+#   python benchmarks/run_benchmarks.py compare benchmarks/baseline.json results.json [--threshold 0.2]
+#   python benchmarks/run_benchmarks.py run --compare benchmarks/baseline.json
+#
+# Results are JSON: {"meta": {...}, "results": {case: {"median_s", "min_s", "mean_s", "runs", ...}}}.
+# compare exits with status 1 when any case's median is slower than baseline * (1 + threshold).
+# Cases whose project dependencies are not installed are recorded as skipped, not failed.
+
+import argparse, contextlib, importlib.util, io, json, os, platform, random, statistics, sys, tempfile, time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+
+NOTES_DIR = os.path.join(REPO_ROOT, "Secure Notes Hybrid Cryptography 1OX22CS054")
+TDES_APP = os.path.join(REPO_ROOT, "3des", "app.py")
+VOTING_DIR = os.path.join(REPO_ROOT, "Secure voting sys-1OX22CS053-1OX22CS046")
+TICKETING_DIR = os.path.join(REPO_ROOT, "secure-qr-ticketing-system-1OX22CS039-1OX22CS041-1OX22CS058",
+                             "secure-qr-ticketing")
+
+_WORDS = ("the quick brown fox jumps over lazy dog meeting notes budget report secure cipher "
+          "tomorrow office project review account password river bridge council").split()
+# doubled letters make Playfair insert fillers, which decrypt_note has to strip again
+_DOUBLED_WORDS = ("committee balloon coffee bookkeeper letter address little happiness "
+                  "success all see moon bottle summer wool").split()
+
+def _load_module(name, path):
+    """Import a project file by path (the project folders are not packages)."""
+    folder = os.path.dirname(path)
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module   # so process pools can pickle its functions by reference
+    spec.loader.exec_module(module)
+    return module
+
+def _drain(chunks):
+    for _ in chunks:
+        pass
+
+def _prose(size, seed=0, words=_WORDS):
+    rng = random.Random(seed)
+    out = []
+    length = 0
+    while length < size:
+        word = rng.choice(words)
+        out.append(word)
+        length += len(word) + 1
+    return " ".join(out)[:size]
+
+# ---------------------------
+# Cases: each setup returns (fn, bytes_per_call) or (fn, chars_per_call, "chars"); fn is timed
+# once per run. "chars" cases report ns/char, which compare checks, so a cost per character that
+# grows with the input (e.g. a quadratic step) shows up as a regression of the larger sizes.
+# Builders are called with keyword arguments and take what they need; wanted(*names) says whether
+# --filter selects any of those case names, so inputs for unselected cases are never built, and
+# cleanup is an ExitStack that is unwound once the suite's cases have run.
+# ---------------------------
+def _notes_cases(sizes, quick, wanted, **_):
+    ciphers = _load_module("ciphers", os.path.join(NOTES_DIR, "ciphers.py"))
+    cases = {}
+    for label, size in sizes:
+        if not wanted(f"notes.encrypt_note[{label}]", f"notes.decrypt_note[{label}]"):
+            continue
+        text = _prose(size)
+        cipher, metadata = ciphers.encrypt_note(text, 3, "LEMON", "MONARCHY")
+        cases[f"notes.encrypt_note[{label}]"] = (
+            lambda text=text: ciphers.encrypt_note(text, 3, "LEMON", "MONARCHY"), size)
+        cases[f"notes.decrypt_note[{label}]"] = (
+            lambda c=cipher, m=metadata: ciphers.decrypt_note(c, 3, "LEMON", "MONARCHY", m), size)
+    # linear-scaling check: filler-heavy text up to 10M chars, ns/char should stay flat. The
+    # "python" cases disable the NumPy path so the pure-Python filler/non-alpha steps are timed too.
+    def pure_python(fn):
+        def run():
+            threshold, ciphers.NUMPY_THRESHOLD = ciphers.NUMPY_THRESHOLD, float("inf")
+            try:
+                return fn()
+            finally:
+                ciphers.NUMPY_THRESHOLD = threshold
+        return run
+
+    scaling = [("100K", 100_000), ("1M", 1_000_000)] + ([] if quick else [("10M", 10_000_000)])
+    for label, size in scaling:
+        if not wanted(f"notes.decrypt_note_scaling[{label}]", f"notes.decrypt_note_scaling[python,{label}]"):
+            continue
+        text = _prose(size, words=_DOUBLED_WORDS)
+        cipher, metadata = ciphers.encrypt_note(text, 3, "LEMON", "MONARCHY")
+        decrypt = lambda c=cipher, m=metadata: ciphers.decrypt_note(c, 3, "LEMON", "MONARCHY", m)
+        cases[f"notes.decrypt_note_scaling[{label}]"] = (decrypt, size, "chars")
+        cases[f"notes.decrypt_note_scaling[python,{label}]"] = (pure_python(decrypt), size, "chars")
+    # batch fan-out: ~2.4 KB notes over 20 key sets, max_workers swept from 1 up to the CPU count (at least 2)
+    # ("auto" is the default, which stays in-process below BATCH_PARALLEL_MIN_CHARS)
+    count = 250 if quick else 1000
+    sweep = [1]
+    while sweep[-1] < max(os.cpu_count() or 1, 2):   # at least 1 and 2, so pool overhead is always shown
+        sweep.append(min(sweep[-1] * 2, max(os.cpu_count() or 1, 2)))
+    labels = [f"{count} notes,w={workers or 'auto'}" for workers in sweep + [None]]
+    if not wanted(*(f"notes.{op}_notes_batch[{label}]" for op in ("encrypt", "decrypt") for label in labels)):
+        return cases
+    jobs = [(_prose(2400, seed=i), i % 26, f"LEMON{'ABCDE'[i % 5]}", ("MONARCHY", "PLAYFAIR", "KEYWORD", "CIPHER")[i % 4])
+            for i in range(count)]
+    encrypted = ciphers.encrypt_notes_batch(jobs, max_workers=1)
+    decrypt_jobs = [(c, *job[1:], m) for job, (c, m) in zip(jobs, encrypted)]
+    chars = sum(len(job[0]) for job in jobs)
+    for workers, label in zip(sweep + [None], labels):
+        cases[f"notes.encrypt_notes_batch[{label}]"] = (
+            lambda w=workers: ciphers.encrypt_notes_batch(jobs, max_workers=w), chars)
+        cases[f"notes.decrypt_notes_batch[{label}]"] = (
+            lambda w=workers: ciphers.decrypt_notes_batch(decrypt_jobs, max_workers=w), chars)
+    return cases
+
+def _tdes_cases(sizes, wanted, **_):
+    tdes = _load_module("tdes_app", TDES_APP)
+    cases = {}
+    for label, size in sizes:
+        if not wanted(f"3des.encrypt_3des[{label}]", f"3des.decrypt_3des[{label}]"):
+            continue
+        text = _prose(size)
+        token = tdes.encrypt_3des(text, "key-one", "key-two", "key-three")
+        cases[f"3des.encrypt_3des[{label}]"] = (
+            lambda text=text: tdes.encrypt_3des(text, "key-one", "key-two", "key-three"), size)
+        cases[f"3des.decrypt_3des[{label}]"] = (
+            lambda token=token: tdes.decrypt_3des(token, "key-one", "key-two", "key-three"), size)
+    # every registered algorithm behind /process, same keys and inputs
+    for algorithm in tdes.CIPHERS:
+        for label, size in sizes:
+            if not wanted(f"3des.encrypt_text[{algorithm},{label}]", f"3des.decrypt_text[{algorithm},{label}]"):
+                continue
+            text = _prose(size)
+            token = tdes.encrypt_text(text, "key-one", "key-two", "key-three", algorithm)
+            cases[f"3des.encrypt_text[{algorithm},{label}]"] = (
+                lambda text=text, a=algorithm: tdes.encrypt_text(text, "key-one", "key-two", "key-three", a), size)
+            cases[f"3des.decrypt_text[{algorithm},{label}]"] = (
+                lambda token=token: tdes.decrypt_text(token, "key-one", "key-two", "key-three"), size)
+    # 100 short strings: one /process request each vs one /process-batch request
+    client = tdes.app.test_client()
+    keys = {"key1": "key-one", "key2": "key-two", "key3": "key-three"}
+    items = [{"text": f"short message {i}", "action": "encrypt"} for i in range(100)]
+
+    def singles():
+        for item in items:
+            client.post("/process", json={**keys, **item})
+
+    cases["3des.process[100 requests]"] = (singles, 0)
+    cases["3des.process_batch[100 items]"] = (lambda: client.post("/process-batch", json={**keys, "items": items}), 0)
+    cases["3des.process_batch[100 items,parallel]"] = (
+        lambda: client.post("/process-batch", json={**keys, "items": items, "parallel": True}), 0)
+    # file mode: fixed-size chunks through one CBC cipher
+    if not wanted("3des.encrypt_3des_stream", "3des.decrypt_3des_stream"):
+        return cases
+    size = sizes[-1][1] * 4
+    data = os.urandom(size)
+    encrypted = b"".join(tdes.encrypt_3des_stream(io.BytesIO(data), "key-one", "key-two", "key-three"))
+    cases["3des.encrypt_3des_stream"] = (
+        lambda: _drain(tdes.encrypt_3des_stream(io.BytesIO(data), "key-one", "key-two", "key-three")), size)
+    cases["3des.decrypt_3des_stream"] = (
+        lambda: _drain(tdes.decrypt_3des_stream(io.BytesIO(encrypted), "key-one", "key-two", "key-three")), size)
+    return cases
+
+def _voting_cases(wanted, **_):
+    if not wanted("voting.hybrid_encrypt", "voting.hybrid_decrypt"):
+        return {}
+    voting = _load_module("election_crypto", os.path.join(VOTING_DIR, "election_crypto.py"))
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_key = private_key.public_key()
+    ballot = b"VoterID: V0001 -> Vote: Alice"
+    envelope = voting.hybrid_encrypt(ballot, public_key)
+    return {
+        "voting.hybrid_encrypt": (lambda: voting.hybrid_encrypt(ballot, public_key), len(ballot)),
+        "voting.hybrid_decrypt": (lambda: voting.hybrid_decrypt(envelope, private_key), len(ballot)),
+    }
+
+def _ticketing_cases(runs, wanted, cleanup, **_):
+    if not wanted("ticketing.create_ticket[qr]", "ticketing.create_ticket[no_qr]", "ticketing.validate_ticket"):
+        return {}
+    # Main.py builds its SecureTicketingSystem (keys, tickets.db, QR files) in the working directory
+    workdir = cleanup.enter_context(tempfile.TemporaryDirectory(prefix="ticketing-bench-"))
+    previous = os.getcwd()
+    os.chdir(workdir)
+    try:
+        ticketing = _load_module("ticketing_main", os.path.join(TICKETING_DIR, "Main.py"))
+    finally:
+        os.chdir(previous)
+    system = ticketing.ticketing_system
+    system.db_path = os.path.join(workdir, "tickets.db")
+
+    def create(render_qr):
+        def fn():
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                return system.create_ticket("Concert", "Ada", "A12", 24, render_qr=render_qr)
+            finally:
+                os.chdir(cwd)
+        return fn
+
+    # validation marks tickets used, so every timed call gets a fresh one
+    pending = [system.create_ticket("Concert", "Ada", "A12", 24, render_qr=False)["qr_data"]
+               for _ in range(runs + 1)]
+    return {
+        "ticketing.create_ticket[qr]": (create(True), 0),
+        "ticketing.create_ticket[no_qr]": (create(False), 0),
+        "ticketing.validate_ticket": (lambda: system.validate_ticket(pending.pop()), 0),
+    }
+
+SUITES = {
+    "notes": _notes_cases,
+    "3des": _tdes_cases,
+    "voting": _voting_cases,
+    "ticketing": _ticketing_cases,
+}
+
+# ---------------------------
+# Running / comparing
+# ---------------------------
+def _time_case(fn, runs):
+    fn()  # warm-up (imports, caches)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def run(quick=False, name_filter=None):
+    runs = 3 if quick else 10
+    sizes = [("1KB", 1024), ("64KB", 64 * 1024)] if quick else [("1KB", 1024), ("64KB", 64 * 1024), ("1MB", 1024 * 1024)]
+    results = {}
+
+    def wanted(*names):
+        return not name_filter or any(name_filter in name for name in names)
+
+    for suite, build in SUITES.items():
+        with contextlib.ExitStack() as cleanup:
+            try:
+                cases = build(sizes=sizes, quick=quick, runs=runs, wanted=wanted, cleanup=cleanup)
+            except ImportError as e:
+                results[suite] = {"skipped": f"{type(e).__name__}: {e}"}
+                print(f"{suite:<40} skipped ({e})")
+                continue
+            for name, (fn, size, *unit) in cases.items():
+                if name_filter and name_filter not in name:
+                    continue
+                timings = _time_case(fn, runs)
+                median = statistics.median(timings)
+                entry = {
+                    "median_s": median,
+                    "min_s": min(timings),
+                    "mean_s": statistics.mean(timings),
+                    "runs": runs,
+                }
+                extra = ""
+                if unit == ["chars"]:
+                    entry["ns_per_char"] = median / size * 1e9
+                    extra = f"{entry['ns_per_char']:8.1f} ns/char"
+                elif size:
+                    entry["mb_per_s"] = size / median / 1e6
+                    extra = f"{entry['mb_per_s']:8.2f} MB/s"
+                results[name] = entry
+                print(f"{name:<40} {median * 1000:10.3f} ms {extra}")
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+def compare(baseline, current, threshold):
+    """Return the names of cases whose median (ns/char where recorded) slowed down by more than
+       threshold (fraction).
+    """
+    regressions = []
+    for name, cur in sorted(current["results"].items()):
+        base = baseline["results"].get(name)
+        if not base or "median_s" not in base or "median_s" not in cur:
+            continue
+        if "ns_per_char" in base and "ns_per_char" in cur:
+            ratio = cur["ns_per_char"] / base["ns_per_char"]
+        else:
+            ratio = cur["median_s"] / base["median_s"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "improved"
+        print(f"{name:<40} {base['median_s'] * 1000:10.3f} ms -> {cur['median_s'] * 1000:10.3f} ms  x{ratio:5.2f} {flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crypto path benchmarks for this repository.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_p = sub.add_parser("run", help="run the benchmarks")
+    run_p.add_argument("--quick", action="store_true", help="fewer runs and smaller inputs")
+    run_p.add_argument("--filter", help="only cases whose name contains this text")
+    run_p.add_argument("--output", help="write results JSON here")
+    run_p.add_argument("--save-baseline", action="store_true", help=f"also write {DEFAULT_BASELINE}")
+    run_p.add_argument("--compare", metavar="BASELINE", help="compare against this results file afterwards")
+    run_p.add_argument("--threshold", type=float, default=0.2)
+    cmp_p = sub.add_parser("compare", help="compare two results files")
+    cmp_p.add_argument("baseline")
+    cmp_p.add_argument("current")
+    cmp_p.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run(args.quick, args.filter)
+        paths = ([args.output] if args.output else []) + ([DEFAULT_BASELINE] if args.save_baseline else [])
+        for path in paths:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        if not args.compare:
+            return 0
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        current = report
+    else:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -155,8 +155,8 @@ class SecureTicketingSystem:
         except Exception:
             return False
     
-    def create_ticket(self, event_name, holder_name, seat_number, valid_hours=24):
-        """Create a secure ticket"""
+    def create_ticket(self, event_name, holder_name, seat_number, valid_hours=24, render_qr=True):
+        """Create a secure ticket (render_qr=False skips writing the QR image file)"""
         # Generate unique ticket ID
         ticket_id = str(uuid.uuid4())
         
@@ -203,17 +203,20 @@ class SecureTicketingSystem:
         
         # Generate QR code
         qr_data = json.dumps(qr_payload)
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        
-        qr_image = qr.make_image(fill_color="black", back_color="white")
-        qr_filename = f"ticket_{ticket_id}.png"
-        qr_image.save(qr_filename)
+        qr_filename = None
+        if render_qr:
+            qr = qrcode.QRCode(version=1, box_size=10, border=5)
+            qr.add_data(qr_data)
+            qr.make(fit=True)
+            
+            qr_image = qr.make_image(fill_color="black", back_color="white")
+            qr_filename = f"ticket_{ticket_id}.png"
+            qr_image.save(qr_filename)
         
         return {
             "ticket_id": ticket_id,
             "qr_filename": qr_filename,
+            "qr_data": qr_data,
             "ticket_data": ticket_data
         }
     